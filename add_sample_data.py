@@ -2,19 +2,21 @@
 """Script to add sample data to the database for testing."""
 
 import asyncio
-import json
 from datetime import datetime
 from decimal import Decimal
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.database import AsyncSessionLocal, init_db
+from src.database import AsyncSessionLocal, init_db, run_migrations
 from src.models.space import Space
+from src.services.http_cache import bump_table_version
+from src.services.pricing import effective_prices
 
 
 async def add_sample_spaces():
     """Add sample spaces to the database."""
     
     # Initialize database tables
+    await run_migrations()
     await init_db()
     
     sample_spaces = [
@@ -34,11 +36,11 @@ async def add_sample_spaces():
             "price_per_month": Decimal("3000.00"),
             "area_sqft": 400,
             "max_capacity": 4,
-            "amenities": json.dumps(["Security Camera", "WiFi", "Parking", "Electricity"]),
+            "amenities": ["Security Camera", "WiFi", "Parking", "Electricity"],
             "is_available": True,
             "available_from": datetime(2024, 1, 1),
             "available_until": datetime(2024, 12, 31),
-            "photos": json.dumps([]),
+            "photos": [],
         },
         {
             "title": "Beautiful Backyard for Events",
@@ -56,11 +58,11 @@ async def add_sample_spaces():
             "price_per_month": Decimal("4500.00"),
             "area_sqft": 800,
             "max_capacity": 50,
-            "amenities": json.dumps(["Outdoor Seating", "Garden", "Restroom Access", "Parking"]),
+            "amenities": ["Outdoor Seating", "Garden", "Restroom Access", "Parking"],
             "is_available": True,
             "available_from": datetime(2024, 1, 1),
             "available_until": datetime(2024, 12, 31),
-            "photos": json.dumps([]),
+            "photos": [],
         },
         {
             "title": "Secure Basement Storage",
@@ -78,11 +80,11 @@ async def add_sample_spaces():
             "price_per_month": Decimal("1800.00"),
             "area_sqft": 300,
             "max_capacity": 2,
-            "amenities": json.dumps(["Climate Control", "Security", "Easy Access"]),
+            "amenities": ["Climate Control", "Security", "Easy Access"],
             "is_available": False,
             "available_from": datetime(2024, 1, 1),
             "available_until": datetime(2024, 12, 31),
-            "photos": json.dumps([]),
+            "photos": [],
         },
         {
             "title": "Modern Warehouse Space",
@@ -100,11 +102,11 @@ async def add_sample_spaces():
             "price_per_month": Decimal("9000.00"),
             "area_sqft": 2000,
             "max_capacity": 100,
-            "amenities": json.dumps(["Loading Dock", "High Ceilings", "Security", "Parking", "Restrooms"]),
+            "amenities": ["Loading Dock", "High Ceilings", "Security", "Parking", "Restrooms"],
             "is_available": True,
             "available_from": datetime(2024, 1, 1),
             "available_until": datetime(2024, 12, 31),
-            "photos": json.dumps([]),
+            "photos": [],
         },
         {
             "title": "Cozy Attic Studio",
@@ -122,11 +124,11 @@ async def add_sample_spaces():
             "price_per_month": Decimal("3200.00"),
             "area_sqft": 250,
             "max_capacity": 8,
-            "amenities": json.dumps(["Natural Light", "WiFi", "Heating", "Quiet"]),
+            "amenities": ["Natural Light", "WiFi", "Heating", "Quiet"],
             "is_available": True,
             "available_from": datetime(2024, 1, 1),
             "available_until": datetime(2024, 12, 31),
-            "photos": json.dumps([]),
+            "photos": [],
         },
         {
             "title": "Premium Parking Space",
@@ -144,11 +146,11 @@ async def add_sample_spaces():
             "price_per_month": Decimal("900.00"),
             "area_sqft": 200,
             "max_capacity": 1,
-            "amenities": json.dumps(["Covered", "Security", "24/7 Access", "EV Charging"]),
+            "amenities": ["Covered", "Security", "24/7 Access", "EV Charging"],
             "is_available": True,
             "available_from": datetime(2024, 1, 1),
             "available_until": datetime(2024, 12, 31),
-            "photos": json.dumps([]),
+            "photos": [],
         }
     ]
     
@@ -166,10 +168,11 @@ async def add_sample_spaces():
         
         # Add sample spaces
         for space_data in sample_spaces:
-            space = Space(**space_data)
+            space = Space(**space_data, **effective_prices(space_data))
             session.add(space)
         
         await session.commit()
+        await bump_table_version()
         print(f"Added {len(sample_spaces)} sample spaces to the database.")
 
 
@@ -0,0 +1,103 @@
+"""Alembic environment for the Space Rental API.
+
+Runs against ``settings.DATABASE_URL``. When the application migrates on
+startup it passes its own connection in ``config.attributes["connection"]``
+instead of having this module open one.
+"""
+
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import JSON
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.config import settings
+from src.database import Base
+import src.models.space  # noqa: F401  registers the tables on Base.metadata
+
+config = context.config
+
+# Leave the application's logging alone when invoked from inside it
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Postgres-only GIN indexes on model tables, created by raw DDL because the
+# models cannot declare them portably
+_RAW_DDL_INDEXES = {
+    "ix_spaces_amenities",
+    "ix_spaces_search_vector",
+    "ix_space_availability_range",
+    *(f"ix_spaces_{column}_trgm" for column in ("city", "state", "location", "title")),
+}
+
+
+def _include_object(obj, name, type_, reflected, compare_to) -> bool:
+    # FTS, R*Tree and side tables are created by raw DDL in the migrations,
+    # not declared on the models; autogenerate must not propose dropping them
+    if type_ == "table" and reflected and compare_to is None:
+        return False
+    if type_ == "index" and reflected and compare_to is None:
+        if name in _RAW_DDL_INDEXES:
+            return False
+        return obj.table.name in target_metadata.tables and obj.table.name != "space_amenities"
+    return True
+
+
+def _compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    # SQLite has no JSON type; the column is TEXT holding JSON either way
+    if context.dialect.name == "sqlite" and isinstance(metadata_type, JSON):
+        return False
+    return None
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        compare_type=_compare_type,
+        include_object=_include_object,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL to stdout (``alembic upgrade head --sql``)."""
+    _configure(
+        url=settings.DATABASE_URL,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    # SQLite cannot ALTER most things in place; batch mode rebuilds the table
+    _configure(connection=connection, render_as_batch=connection.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+    else:
+        asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
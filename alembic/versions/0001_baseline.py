@@ -0,0 +1,63 @@
+"""Baseline: the spaces table as originally created by create_all.
+
+Databases created by the old startup ``create_all`` already have this table;
+the migration then only records the revision, and later revisions bring the
+schema up to date.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("spaces"):
+        return
+
+    op.create_table(
+        "spaces",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("space_type", sa.String(50), nullable=False),
+        sa.Column("location", sa.String(200), nullable=False),
+        sa.Column("address", sa.Text(), nullable=False),
+        sa.Column("city", sa.String(100), nullable=False),
+        sa.Column("state", sa.String(50), nullable=False),
+        sa.Column("zip_code", sa.String(20), nullable=False),
+        sa.Column("country", sa.String(50), nullable=True),
+        sa.Column("price_per_hour", sa.Numeric(10, 2), nullable=False),
+        sa.Column("price_per_day", sa.Numeric(10, 2), nullable=True),
+        sa.Column("price_per_week", sa.Numeric(10, 2), nullable=True),
+        sa.Column("price_per_month", sa.Numeric(10, 2), nullable=True),
+        sa.Column("area_sqft", sa.Integer(), nullable=True),
+        sa.Column("max_capacity", sa.Integer(), nullable=True),
+        sa.Column("amenities", sa.Text(), nullable=True),
+        sa.Column("is_available", sa.Boolean(), nullable=True),
+        sa.Column("available_from", sa.DateTime(), nullable=True),
+        sa.Column("available_until", sa.DateTime(), nullable=True),
+        sa.Column("photos", sa.Text(), nullable=True),
+        sa.Column("host_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_spaces_id", "spaces", ["id"])
+    op.create_index("ix_spaces_title", "spaces", ["title"])
+    op.create_index("ix_spaces_city", "spaces", ["city"])
+    op.create_index("ix_spaces_is_available", "spaces", ["is_available"])
+
+
+def downgrade() -> None:
+    op.drop_table("spaces")
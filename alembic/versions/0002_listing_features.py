@@ -0,0 +1,236 @@
+"""Listing features: cursor, geo and partner-feed columns, JSON lists, and the
+full-text, amenity and availability indexes.
+
+Written to also upgrade databases that an intermediate release created with
+``create_all``, so every step skips objects that already exist.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_POSTGRES_UPGRADE = [
+    # Columns created before amenities/photos became native JSON held JSON text
+    """
+    DO $$
+    BEGIN
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'spaces' AND column_name = 'amenities') = 'text' THEN
+            ALTER TABLE spaces ALTER COLUMN amenities TYPE jsonb USING amenities::jsonb;
+            ALTER TABLE spaces ALTER COLUMN photos TYPE jsonb USING photos::jsonb;
+        END IF;
+    END $$
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_spaces_amenities ON spaces USING GIN (amenities jsonb_path_ops)",
+    """
+    ALTER TABLE spaces ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_spaces_search_vector ON spaces USING GIN (search_vector)",
+    """
+    INSERT INTO space_availability (space_id, starts_at, ends_at)
+    SELECT id, available_from AT TIME ZONE 'UTC', available_until AT TIME ZONE 'UTC' FROM spaces
+    WHERE available_from IS NOT NULL AND available_until > available_from
+    AND NOT EXISTS (SELECT 1 FROM space_availability)
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_space_availability_range "
+    "ON space_availability USING GIST (tstzrange(starts_at, ends_at))",
+]
+
+_POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_space_availability_range",
+    "DROP INDEX IF EXISTS ix_spaces_search_vector",
+    "ALTER TABLE spaces DROP COLUMN IF EXISTS search_vector",
+    "DROP INDEX IF EXISTS ix_spaces_amenities",
+    "ALTER TABLE spaces ALTER COLUMN amenities TYPE text USING amenities::text",
+    "ALTER TABLE spaces ALTER COLUMN photos TYPE text USING photos::text",
+]
+
+_SQLITE_UPGRADE = [
+    # Full-text search: external-content FTS5 table kept in sync by triggers
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS spaces_fts USING fts5(
+        title, description, location,
+        content='spaces', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS spaces_fts_ai AFTER INSERT ON spaces BEGIN
+        INSERT INTO spaces_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS spaces_fts_ad AFTER DELETE ON spaces BEGIN
+        INSERT INTO spaces_fts(spaces_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS spaces_fts_au
+    AFTER UPDATE OF title, description, location ON spaces BEGIN
+        INSERT INTO spaces_fts(spaces_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO spaces_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    "INSERT INTO spaces_fts(spaces_fts) VALUES ('rebuild')",
+    # Amenities: normalized side table kept in sync with the JSON column
+    """
+    CREATE TABLE IF NOT EXISTS space_amenities (
+        amenity VARCHAR(100) NOT NULL,
+        space_id INTEGER NOT NULL REFERENCES spaces(id) ON DELETE CASCADE,
+        PRIMARY KEY (amenity, space_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_space_amenities_space_id ON space_amenities (space_id)",
+    """
+    CREATE TRIGGER IF NOT EXISTS space_amenities_ai AFTER INSERT ON spaces BEGIN
+        INSERT OR IGNORE INTO space_amenities(amenity, space_id)
+        SELECT value, new.id FROM json_each(new.amenities) WHERE type = 'text';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS space_amenities_ad AFTER DELETE ON spaces BEGIN
+        DELETE FROM space_amenities WHERE space_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS space_amenities_au AFTER UPDATE OF amenities ON spaces BEGIN
+        DELETE FROM space_amenities WHERE space_id = old.id;
+        INSERT OR IGNORE INTO space_amenities(amenity, space_id)
+        SELECT value, new.id FROM json_each(new.amenities) WHERE type = 'text';
+    END
+    """,
+    """
+    INSERT OR IGNORE INTO space_amenities(amenity, space_id)
+    SELECT je.value, spaces.id FROM spaces, json_each(spaces.amenities) AS je
+    WHERE json_valid(spaces.amenities) AND je.type = 'text'
+    """,
+    # Availability: seed from the legacy columns, then a 1-D R*Tree over the windows
+    """
+    INSERT INTO space_availability (space_id, starts_at, ends_at)
+    SELECT id, available_from, available_until FROM spaces
+    WHERE available_from IS NOT NULL AND available_until > available_from
+    AND NOT EXISTS (SELECT 1 FROM space_availability)
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS space_availability_rtree USING rtree(id, starts, ends)",
+    """
+    CREATE TRIGGER IF NOT EXISTS space_availability_rtree_ai
+    AFTER INSERT ON space_availability BEGIN
+        INSERT INTO space_availability_rtree(id, starts, ends)
+        VALUES (new.id, CAST(strftime('%s', new.starts_at) AS REAL),
+                CAST(strftime('%s', new.ends_at) AS REAL));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS space_availability_rtree_ad
+    AFTER DELETE ON space_availability BEGIN
+        DELETE FROM space_availability_rtree WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS space_availability_rtree_au
+    AFTER UPDATE OF starts_at, ends_at ON space_availability BEGIN
+        UPDATE space_availability_rtree
+        SET starts = CAST(strftime('%s', new.starts_at) AS REAL),
+            ends = CAST(strftime('%s', new.ends_at) AS REAL)
+        WHERE id = new.id;
+    END
+    """,
+    """
+    INSERT OR IGNORE INTO space_availability_rtree(id, starts, ends)
+    SELECT id, CAST(strftime('%s', starts_at) AS REAL), CAST(strftime('%s', ends_at) AS REAL)
+    FROM space_availability
+    """,
+]
+
+_SQLITE_DOWNGRADE = [
+    "DROP TABLE IF EXISTS space_availability_rtree",
+    "DROP TRIGGER IF EXISTS space_amenities_ai",
+    "DROP TRIGGER IF EXISTS space_amenities_ad",
+    "DROP TRIGGER IF EXISTS space_amenities_au",
+    "DROP TABLE IF EXISTS space_amenities",
+    "DROP TRIGGER IF EXISTS spaces_fts_ai",
+    "DROP TRIGGER IF EXISTS spaces_fts_ad",
+    "DROP TRIGGER IF EXISTS spaces_fts_au",
+    "DROP TABLE IF EXISTS spaces_fts",
+]
+
+_NEW_COLUMNS = [
+    sa.Column("external_id", sa.String(100), nullable=True),
+    sa.Column("latitude", sa.Float(), nullable=True),
+    sa.Column("longitude", sa.Float(), nullable=True),
+    sa.Column("geohash", sa.String(12), nullable=True),
+]
+
+_NEW_INDEXES = [
+    ("ix_spaces_external_id", ["external_id"], True),
+    ("ix_spaces_geohash", ["geohash"], False),
+    ("ix_spaces_created_at_id", ["created_at", "id"], False),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    existing = {column["name"] for column in inspector.get_columns("spaces")}
+    for column in _NEW_COLUMNS:
+        if column.name not in existing:
+            op.add_column("spaces", column.copy())
+    for name, columns, unique in _NEW_INDEXES:
+        op.create_index(name, "spaces", columns, unique=unique, if_not_exists=True)
+
+    if not inspector.has_table("space_availability"):
+        op.create_table(
+            "space_availability",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "space_id",
+                sa.Integer(),
+                sa.ForeignKey("spaces.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("starts_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("ends_at", sa.DateTime(timezone=True), nullable=False),
+        )
+    op.create_index(
+        "ix_space_availability_space_id_starts_at",
+        "space_availability",
+        ["space_id", "starts_at"],
+        if_not_exists=True,
+    )
+
+    statements = {"postgresql": _POSTGRES_UPGRADE, "sqlite": _SQLITE_UPGRADE}
+    for ddl in statements.get(bind.dialect.name, []):
+        op.execute(ddl)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    statements = {"postgresql": _POSTGRES_DOWNGRADE, "sqlite": _SQLITE_DOWNGRADE}
+    for ddl in statements.get(bind.dialect.name, []):
+        op.execute(ddl)
+
+    op.drop_table("space_availability")
+    for name, _, _ in reversed(_NEW_INDEXES):
+        op.drop_index(name, table_name="spaces")
+    with op.batch_alter_table("spaces") as batch:
+        for column in reversed(_NEW_COLUMNS):
+            batch.drop_column(column.name)
@@ -0,0 +1,59 @@
+"""Composite and partial indexes for the listing query shapes.
+
+Every listing is ordered by (created_at, id) and most filter on availability
+and type or an hourly price range. The single-column index on the boolean
+``is_available`` is never selective enough to be used and is dropped.
+``benchmarks/explain.py`` checks each shape against these indexes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite matches a partial index only when the query repeats its WHERE term,
+# and the ORM compares booleans as "is_available = 1" there
+_AVAILABLE = {
+    "postgresql_where": sa.text("is_available = true"),
+    "sqlite_where": sa.text("is_available = 1"),
+}
+
+
+def upgrade() -> None:
+    # Default renter listing: available spaces, newest first
+    op.create_index(
+        "ix_spaces_available_newest", "spaces", ["created_at", "id"], if_not_exists=True, **_AVAILABLE
+    )
+    # Type (+ availability), newest first. space_type leads so that
+    # availability-only listings are left to the smaller partial index above
+    op.create_index(
+        "ix_spaces_type_available_newest",
+        "spaces",
+        ["space_type", "is_available", "created_at", "id"],
+        if_not_exists=True,
+    )
+    # Hourly price ranges over available spaces, and within a type
+    op.create_index(
+        "ix_spaces_available_price", "spaces", ["price_per_hour"], if_not_exists=True, **_AVAILABLE
+    )
+    op.create_index(
+        "ix_spaces_type_price", "spaces", ["space_type", "price_per_hour"], if_not_exists=True
+    )
+    op.drop_index("ix_spaces_is_available", table_name="spaces", if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index("ix_spaces_is_available", "spaces", ["is_available"])
+    op.drop_index("ix_spaces_type_price", table_name="spaces")
+    op.drop_index("ix_spaces_available_price", table_name="spaces")
+    op.drop_index("ix_spaces_type_available_newest", table_name="spaces")
+    op.drop_index("ix_spaces_available_newest", table_name="spaces")
@@ -0,0 +1,141 @@
+"""Effective prices: hourly and daily equivalents of the quoted price, and
+indexes for the price, area and capacity sorts.
+
+``price_per_hour`` becomes nullable, since a listing quoted per day, week or
+month has no hourly price. Price filters and the price indexes from 0003 move
+to ``effective_price_per_hour``.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_AVAILABLE = {
+    "postgresql_where": sa.text("is_available = true"),
+    "sqlite_where": sa.text("is_available = 1"),
+}
+
+# Same factors as src/services/pricing.py at the time of this revision
+_PER_HOUR = (
+    "COALESCE(price_per_hour, price_per_day / 24.0, "
+    "price_per_week / 168.0, price_per_month / 720.0)"
+)
+
+# Rebuilding the table on SQLite drops its triggers; these are the ones
+# revision 0002 created, unchanged
+_SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS spaces_fts_ai AFTER INSERT ON spaces BEGIN
+        INSERT INTO spaces_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS spaces_fts_ad AFTER DELETE ON spaces BEGIN
+        INSERT INTO spaces_fts(spaces_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS spaces_fts_au
+    AFTER UPDATE OF title, description, location ON spaces BEGIN
+        INSERT INTO spaces_fts(spaces_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO spaces_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS space_amenities_ai AFTER INSERT ON spaces BEGIN
+        INSERT OR IGNORE INTO space_amenities(amenity, space_id)
+        SELECT value, new.id FROM json_each(new.amenities) WHERE type = 'text';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS space_amenities_ad AFTER DELETE ON spaces BEGIN
+        DELETE FROM space_amenities WHERE space_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS space_amenities_au AFTER UPDATE OF amenities ON spaces BEGIN
+        DELETE FROM space_amenities WHERE space_id = old.id;
+        INSERT OR IGNORE INTO space_amenities(amenity, space_id)
+        SELECT value, new.id FROM json_each(new.amenities) WHERE type = 'text';
+    END
+    """,
+]
+
+
+def _set_price_per_hour_nullable(nullable: bool) -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("spaces", recreate="always") as batch:
+            batch.alter_column("price_per_hour", existing_type=sa.Numeric(10, 2), nullable=nullable)
+        for ddl in _SQLITE_TRIGGERS:
+            op.execute(ddl)
+    else:
+        op.alter_column(
+            "spaces", "price_per_hour", existing_type=sa.Numeric(10, 2), nullable=nullable
+        )
+
+
+def _size_key(column: str) -> sa.sql.ClauseElement:
+    return sa.func.coalesce(sa.column(column), sa.literal_column("0"))
+
+
+def upgrade() -> None:
+    op.drop_index("ix_spaces_available_price", table_name="spaces")
+    op.drop_index("ix_spaces_type_price", table_name="spaces")
+    op.add_column("spaces", sa.Column("effective_price_per_hour", sa.Numeric(12, 4), nullable=True))
+    op.add_column("spaces", sa.Column("effective_price_per_day", sa.Numeric(12, 4), nullable=True))
+    _set_price_per_hour_nullable(True)
+
+    op.execute(
+        f"UPDATE spaces SET effective_price_per_hour = ROUND({_PER_HOUR}, 4), "
+        f"effective_price_per_day = ROUND({_PER_HOUR} * 24, 4)"
+    )
+
+    op.create_index("ix_spaces_effective_price", "spaces", ["effective_price_per_hour", "id"])
+    op.create_index("ix_spaces_effective_price_day", "spaces", ["effective_price_per_day"])
+    op.create_index(
+        "ix_spaces_available_price", "spaces", ["effective_price_per_hour", "id"], **_AVAILABLE
+    )
+    op.create_index(
+        "ix_spaces_type_price", "spaces", ["space_type", "effective_price_per_hour", "id"]
+    )
+    op.create_index("ix_spaces_area", "spaces", [_size_key("area_sqft"), "id"])
+    op.create_index("ix_spaces_capacity", "spaces", [_size_key("max_capacity"), "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_spaces_capacity", table_name="spaces")
+    op.drop_index("ix_spaces_area", table_name="spaces")
+    op.drop_index("ix_spaces_type_price", table_name="spaces")
+    op.drop_index("ix_spaces_available_price", table_name="spaces")
+    op.drop_index("ix_spaces_effective_price_day", table_name="spaces")
+    op.drop_index("ix_spaces_effective_price", table_name="spaces")
+
+    # Listings quoted in other units get their hourly equivalent back
+    op.execute(
+        "UPDATE spaces SET price_per_hour = ROUND(effective_price_per_hour, 2) "
+        "WHERE price_per_hour IS NULL"
+    )
+    _set_price_per_hour_nullable(False)
+    with op.batch_alter_table("spaces") as batch:
+        batch.drop_column("effective_price_per_day")
+        batch.drop_column("effective_price_per_hour")
+    if op.get_bind().dialect.name == "sqlite":
+        for ddl in _SQLITE_TRIGGERS:
+            op.execute(ddl)
+
+    op.create_index("ix_spaces_available_price", "spaces", ["price_per_hour"], **_AVAILABLE)
+    op.create_index("ix_spaces_type_price", "spaces", ["space_type", "price_per_hour"])
@@ -0,0 +1,86 @@
+"""Table versions: a counter bumped by every write to the listing tables.
+
+``GET /spaces`` and friends derive their ETag from this counter, so a
+conditional request is answered with one primary-key lookup instead of the
+listing query. Writes to ``spaces`` and ``space_availability`` both bump the
+``spaces`` row, since either can change a listing.
+
+On Postgres the triggers are per statement, so a bulk write bumps the
+counter once. Writers serialize on the counter row until they commit.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABLES = ("spaces", "space_availability")
+
+_POSTGRES_UPGRADE = [
+    """
+    CREATE FUNCTION bump_table_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = TG_ARGV[0];
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    *(
+        f"""
+        CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version('spaces')
+        """
+        for table in _TABLES
+    ),
+]
+
+_POSTGRES_DOWNGRADE = [
+    *(f"DROP TRIGGER IF EXISTS {table}_version ON {table}" for table in _TABLES),
+    "DROP FUNCTION IF EXISTS bump_table_version()",
+]
+
+# SQLite only has row-level triggers
+_SQLITE_UPGRADE = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_version_{suffix} AFTER {event} ON {table} BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'spaces';
+    END
+    """
+    for table in _TABLES
+    for suffix, event in (("ai", "INSERT"), ("ad", "DELETE"), ("au", "UPDATE"))
+]
+
+_SQLITE_DOWNGRADE = [
+    f"DROP TRIGGER IF EXISTS {table}_version_{suffix}"
+    for table in _TABLES
+    for suffix in ("ai", "ad", "au")
+]
+
+
+def upgrade() -> None:
+    table_versions = op.create_table(
+        "table_versions",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+    op.bulk_insert(table_versions, [{"name": "spaces", "version": 1}])
+
+    statements = {"postgresql": _POSTGRES_UPGRADE, "sqlite": _SQLITE_UPGRADE}
+    for ddl in statements.get(op.get_bind().dialect.name, []):
+        op.execute(ddl)
+
+
+def downgrade() -> None:
+    statements = {"postgresql": _POSTGRES_DOWNGRADE, "sqlite": _SQLITE_DOWNGRADE}
+    for ddl in statements.get(op.get_bind().dialect.name, []):
+        op.execute(ddl)
+    op.drop_table("table_versions")
@@ -0,0 +1,30 @@
+"""Row version on spaces for optimistic concurrency.
+
+Every write increments ``version``; clients send it back in ``If-Match`` so
+an update based on a stale read fails instead of overwriting.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default, so SQLite adds the column in place and keeps the triggers
+    op.add_column(
+        "spaces", sa.Column("version", sa.Integer(), nullable=False, server_default="1")
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("spaces", "version")
@@ -0,0 +1,46 @@
+"""Trigram indexes for typeahead suggestions on Postgres.
+
+``GET /spaces/suggest`` falls back to ``ILIKE 'prefix%' OR ILIKE '% prefix%'``
+over city, state, location and title when the in-memory index is off
+(serverless) or still loading; GIN ``gin_trgm_ops`` indexes serve both
+patterns. SQLite has no equivalent and scans, which is fine at its sizes.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = ("city", "state", "location", "title")
+
+_POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    *(
+        f"CREATE INDEX IF NOT EXISTS ix_spaces_{column}_trgm ON spaces "
+        f"USING GIN ({column} gin_trgm_ops)"
+        for column in _COLUMNS
+    ),
+]
+
+# The extension stays: other objects may depend on it
+_POSTGRES_DOWNGRADE = [f"DROP INDEX IF EXISTS ix_spaces_{column}_trgm" for column in _COLUMNS]
+
+
+def upgrade() -> None:
+    statements = {"postgresql": _POSTGRES_UPGRADE}
+    for ddl in statements.get(op.get_bind().dialect.name, []):
+        op.execute(ddl)
+
+
+def downgrade() -> None:
+    statements = {"postgresql": _POSTGRES_DOWNGRADE}
+    for ddl in statements.get(op.get_bind().dialect.name, []):
+        op.execute(ddl)
@@ -0,0 +1,77 @@
+"""Drop the table version triggers; the application bumps the counter instead.
+
+The triggers of 0005 ran the counter ``UPDATE`` inside every writer's
+transaction, so writers held the one counter row until commit: every write
+queued behind it, and a writer holding a space row while waiting on the
+counter could deadlock with one holding the counter while waiting on that
+space. ``http_cache.bump_table_version`` now runs the ``UPDATE`` as a
+transaction of its own after the write commits. Writes made outside the
+application (scripts, manual SQL) must bump the counter themselves.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABLES = ("spaces", "space_availability")
+_SQLITE_SUFFIXES = (("ai", "INSERT"), ("ad", "DELETE"), ("au", "UPDATE"))
+
+_POSTGRES_UPGRADE = [
+    *(f"DROP TRIGGER IF EXISTS {table}_version ON {table}" for table in _TABLES),
+    "DROP FUNCTION IF EXISTS bump_table_version()",
+]
+
+_POSTGRES_DOWNGRADE = [
+    """
+    CREATE FUNCTION bump_table_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = TG_ARGV[0];
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    *(
+        f"""
+        CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version('spaces')
+        """
+        for table in _TABLES
+    ),
+]
+
+_SQLITE_UPGRADE = [
+    f"DROP TRIGGER IF EXISTS {table}_version_{suffix}"
+    for table in _TABLES
+    for suffix, _ in _SQLITE_SUFFIXES
+]
+
+_SQLITE_DOWNGRADE = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_version_{suffix} AFTER {event} ON {table} BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'spaces';
+    END
+    """
+    for table in _TABLES
+    for suffix, event in _SQLITE_SUFFIXES
+]
+
+
+def upgrade() -> None:
+    statements = {"postgresql": _POSTGRES_UPGRADE, "sqlite": _SQLITE_UPGRADE}
+    for ddl in statements.get(op.get_bind().dialect.name, []):
+        op.execute(ddl)
+
+
+def downgrade() -> None:
+    statements = {"postgresql": _POSTGRES_DOWNGRADE, "sqlite": _SQLITE_DOWNGRADE}
+    for ddl in statements.get(op.get_bind().dialect.name, []):
+        op.execute(ddl)
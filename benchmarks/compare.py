@@ -0,0 +1,61 @@
+"""Compare two ``benchmarks.suite`` reports scenario by scenario.
+
+    python -m benchmarks.compare base.json head.json --threshold 10
+
+Exits non-zero when any scenario's p95 regressed by more than ``--threshold``
+percent, so it can gate CI.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 regression, percent")
+    args = parser.parse_args()
+
+    base, head = _load(args.base), _load(args.head)
+    base_results = {r["scenario"]: r for r in base["results"]}
+    rows = []
+    regressed = []
+    for result in head["results"]:
+        before = base_results.get(result["scenario"])
+        if before is None:
+            continue
+        changes = {m: round(_change(before[m], result[m]), 1) for m in METRICS}
+        rows.append({"scenario": result["scenario"], "change_pct": changes})
+        if changes["p95_ms"] > args.threshold:
+            regressed.append(result["scenario"])
+
+    print(
+        json.dumps(
+            {
+                "base": base["meta"].get("commit"),
+                "head": head["meta"].get("commit"),
+                "scenarios": rows,
+                "regressed": regressed,
+            },
+            indent=2,
+        )
+    )
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
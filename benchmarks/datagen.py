@@ -0,0 +1,196 @@
+"""Seeded synthetic Space rows at any scale.
+
+Rows are a pure function of ``(seed, index)``, so a dataset can be generated
+in batches (or resumed) without holding it in memory, and two runs with the
+same seed load identical tables. ``load`` bulk inserts with multi-row INSERT
+batches, one transaction per batch.
+
+    python -m benchmarks.datagen --rows 1000000 --seed 42
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List
+
+# (city, state, latitude, longitude, weight): weights skew the data like real
+# listings, so equality filters hit both large and small cities
+CITIES = [
+    ("New York", "NY", 40.7128, -74.0060, 14),
+    ("Los Angeles", "CA", 34.0522, -118.2437, 11),
+    ("Chicago", "IL", 41.8781, -87.6298, 8),
+    ("Houston", "TX", 29.7604, -95.3698, 7),
+    ("Phoenix", "AZ", 33.4484, -112.0740, 5),
+    ("Philadelphia", "PA", 39.9526, -75.1652, 5),
+    ("San Antonio", "TX", 29.4241, -98.4936, 4),
+    ("San Diego", "CA", 32.7157, -117.1611, 4),
+    ("Dallas", "TX", 32.7767, -96.7970, 4),
+    ("Austin", "TX", 30.2672, -97.7431, 4),
+    ("San Francisco", "CA", 37.7749, -122.4194, 6),
+    ("Seattle", "WA", 47.6062, -122.3321, 5),
+    ("Denver", "CO", 39.7392, -104.9903, 3),
+    ("Boston", "MA", 42.3601, -71.0589, 4),
+    ("Portland", "OR", 45.5152, -122.6784, 3),
+    ("Miami", "FL", 25.7617, -80.1918, 3),
+    ("Atlanta", "GA", 33.7490, -84.3880, 3),
+    ("Minneapolis", "MN", 44.9778, -93.2650, 2),
+    ("Nashville", "TN", 36.1627, -86.7816, 2),
+    ("Boise", "ID", 43.6150, -116.2023, 1),
+]
+
+# (space_type, weight, hourly price range, area range, capacity range)
+SPACE_TYPES = [
+    ("garage", 30, (5, 40), (150, 900), (1, 8)),
+    ("parking_space", 25, (2, 15), (120, 300), (1, 2)),
+    ("backyard", 15, (15, 120), (300, 5000), (5, 150)),
+    ("basement", 12, (8, 50), (200, 1500), (2, 20)),
+    ("warehouse", 8, (40, 400), (2000, 50000), (5, 200)),
+    ("attic", 6, (5, 30), (100, 800), (1, 6)),
+    ("other", 4, (10, 80), (100, 3000), (1, 40)),
+]
+
+AMENITIES = [
+    "WiFi", "Parking", "Electricity", "Security Camera", "Climate Control",
+    "Restroom Access", "Outdoor Seating", "Garden", "Loading Dock", "24/7 Access",
+    "Water Access", "Lighting", "Storage Shelves", "EV Charger", "Wheelchair Access",
+]
+
+ADJECTIVES = [
+    "Spacious", "Cozy", "Secure", "Private", "Bright", "Quiet", "Clean", "Modern",
+    "Covered", "Sunny", "Rustic", "Renovated", "Convenient", "Large", "Compact",
+]
+NOUNS = {
+    "garage": ["garage", "carport", "workshop garage"],
+    "parking_space": ["parking spot", "driveway", "parking space"],
+    "backyard": ["backyard", "garden", "patio", "lawn"],
+    "basement": ["basement", "cellar", "lower level"],
+    "warehouse": ["warehouse", "storage unit", "loft warehouse"],
+    "attic": ["attic", "loft", "storage attic"],
+    "other": ["studio", "shed", "barn"],
+}
+USES = [
+    "car storage", "a home gym", "band practice", "workshops", "parties", "events",
+    "photo shoots", "seasonal storage", "a pop-up shop", "crafting", "boat storage",
+]
+STREETS = ["Main", "Oak", "Pine", "Maple", "Cedar", "Elm", "Washington", "Lake", "Hill", "Park"]
+DISTRICTS = ["Downtown", "Uptown", "Midtown", "Riverside", "Old Town", "Westside", "Eastside"]
+
+EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+_CITY_WEIGHTS = [c[-1] for c in CITIES]
+_TYPE_WEIGHTS = [t[1] for t in SPACE_TYPES]
+
+
+def generate_row(seed: int, index: int) -> Dict[str, Any]:
+    """Column values for row ``index`` of the dataset identified by ``seed``."""
+    rng = random.Random(seed * 1_000_003 + index)
+    city, state, lat, lon, _ = rng.choices(CITIES, _CITY_WEIGHTS)[0]
+    space_type, _, price_range, area_range, capacity_range = rng.choices(SPACE_TYPES, _TYPE_WEIGHTS)[0]
+    noun = rng.choice(NOUNS[space_type])
+    district = rng.choice(DISTRICTS)
+    price = Decimal(str(round(rng.uniform(*price_range), 2)))
+    # Roughly one listing a minute, strictly increasing with the index
+    created_at = EPOCH + timedelta(seconds=index * 60 + rng.randint(0, 59))
+    return {
+        "title": f"{rng.choice(ADJECTIVES)} {noun} in {district} {city}",
+        "description": (
+            f"{rng.choice(ADJECTIVES)} {noun} available for {rng.choice(USES)} or "
+            f"{rng.choice(USES)}. Easy access from {rng.choice(STREETS)} Street."
+        ),
+        "space_type": space_type,
+        "location": f"{district} {city}",
+        "address": f"{rng.randint(1, 9999)} {rng.choice(STREETS)} Street",
+        "city": city,
+        "state": state,
+        "zip_code": f"{rng.randint(10000, 99999)}",
+        "country": "US",
+        # Scatter within ~25 km of the city centre
+        "latitude": round(lat + rng.uniform(-0.2, 0.2), 6),
+        "longitude": round(lon + rng.uniform(-0.25, 0.25), 6),
+        "price_per_hour": price,
+        "area_sqft": rng.randint(*area_range),
+        "max_capacity": rng.randint(*capacity_range),
+        "amenities": rng.sample(AMENITIES, rng.randint(0, 6)),
+        "is_available": rng.random() < 0.8,
+        "photos": [f"https://example.com/photos/{seed}/{index}/{n}.jpg" for n in range(rng.randint(0, 3))],
+        "created_at": created_at,
+    }
+
+
+def generate_rows(count: int, seed: int = 0, start: int = 0) -> Iterator[Dict[str, Any]]:
+    for index in range(start, start + count):
+        yield generate_row(seed, index)
+
+
+def create_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON body for ``POST /spaces`` equivalent to a generated row."""
+    payload = {k: v for k, v in row.items() if k != "created_at"}
+    payload["price_per_hour"] = str(row["price_per_hour"])
+    return payload
+
+
+async def load(engine: Any, count: int, seed: int = 0, start: int = 0, batch_size: int = 5000) -> int:
+    """Insert rows ``start .. start + count`` of the dataset; returns rows inserted."""
+    from sqlalchemy import insert
+
+    from src.models.space import Space
+    from src.services import geo, pricing
+
+    stmt = insert(Space.__table__)
+    rows: List[Dict[str, Any]] = []
+    inserted = 0
+
+    async def flush() -> None:
+        nonlocal inserted
+        async with engine.begin() as conn:
+            await conn.execute(stmt, rows)
+        inserted += len(rows)
+        rows.clear()
+
+    for row in generate_rows(count, seed, start):
+        row["geohash"] = geo.encode(row["latitude"], row["longitude"])
+        row.update(pricing.effective_prices(row))
+        rows.append(row)
+        if len(rows) >= batch_size:
+            await flush()
+    if rows:
+        await flush()
+    return inserted
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from src.database import engine, init_db, run_migrations
+
+    await run_migrations()
+    await init_db()
+    started = time.perf_counter()
+    inserted = await load(engine, args.rows, args.seed, args.start, args.batch_size)
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    print(
+        json.dumps(
+            {
+                "rows": inserted,
+                "seed": args.seed,
+                "seconds": round(elapsed, 2),
+                "rows_per_second": round(inserted / elapsed) if elapsed else None,
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", type=int, default=0, help="first row index, to extend a dataset")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Per-item cost of turning Space rows into JSON response bytes.
+
+Compares the previous path (construct and validate a ``SpaceResponse`` per
+row, then have Pydantic serialize the page) with the shared fast path
+(``space_to_dict`` + orjson). Runs without a database.
+
+    python -m benchmarks.serialization --items 100 --repeat 200
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, List
+
+from src.models.space import Space
+from src.schemas.space import SpaceListResponse, SpaceResponse
+from src.services.serialization import dumps, space_to_dict
+
+
+def make_spaces(count: int) -> List[Space]:
+    now = datetime.now(timezone.utc)
+    return [
+        Space(
+            id=i,
+            title=f"Spacious garage number {i}",
+            description="Clean, dry and secure garage space with easy access. " * 4,
+            space_type="garage",
+            location="Downtown District",
+            address=f"{i} Main Street",
+            city="San Francisco",
+            state="CA",
+            zip_code="94102",
+            country="US",
+            latitude=37.77,
+            longitude=-122.42,
+            price_per_hour=Decimal("15.00"),
+            area_sqft=400,
+            max_capacity=4,
+            amenities=["Security Camera", "WiFi", "Parking", "Electricity"],
+            is_available=True,
+            photos=["https://example.com/a.jpg", "https://example.com/b.jpg"],
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def validated_path(spaces: List[Space]) -> bytes:
+    """What GET /spaces did before: one validated model per row."""
+    items = [
+        SpaceResponse(
+            id=s.id,
+            external_id=s.external_id,
+            title=s.title,
+            description=s.description,
+            space_type=s.space_type,
+            location=s.location,
+            address=s.address,
+            city=s.city,
+            state=s.state,
+            zip_code=s.zip_code,
+            country=s.country,
+            latitude=s.latitude,
+            longitude=s.longitude,
+            price_per_hour=s.price_per_hour,
+            price_per_day=s.price_per_day,
+            price_per_week=s.price_per_week,
+            price_per_month=s.price_per_month,
+            area_sqft=s.area_sqft,
+            max_capacity=s.max_capacity,
+            amenities=s.amenities or [],
+            is_available=s.is_available,
+            available_from=s.available_from,
+            available_until=s.available_until,
+            photos=s.photos or [],
+            created_at=s.created_at,
+            updated_at=s.updated_at,
+        )
+        for s in spaces
+    ]
+    response = SpaceListResponse(
+        spaces=items, total=len(items), page=1, per_page=len(items), total_pages=1
+    )
+    # FastAPI re-validated the returned model against response_model as well
+    return SpaceListResponse.model_validate(response.model_dump()).model_dump_json().encode()
+
+
+def fast_path(spaces: List[Space]) -> bytes:
+    return dumps(
+        {
+            "spaces": [space_to_dict(s) for s in spaces],
+            "total": len(spaces),
+            "page": 1,
+            "per_page": len(spaces),
+            "total_pages": 1,
+            "next_cursor": None,
+            "count_mode": "exact",
+        }
+    )
+
+
+def measure(fn: Callable[[List[Space]], bytes], spaces: List[Space], repeat: int) -> float:
+    """Best-of-``repeat`` microseconds per item."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(spaces)
+        best = min(best, time.perf_counter() - start)
+    return best / len(spaces) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    spaces = make_spaces(args.items)
+    assert json.loads(validated_path(spaces)) == json.loads(
+        fast_path(spaces)
+    ), "fast path output diverged from SpaceListResponse"
+
+    before = measure(validated_path, spaces, args.repeat)
+    after = measure(fast_path, spaces, args.repeat)
+    print(
+        json.dumps(
+            {
+                "benchmark": "serialization",
+                "items": args.items,
+                "validated_us_per_item": round(before, 2),
+                "fast_us_per_item": round(after, 2),
+                "speedup": round(before / after, 2),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -140,7 +140,8 @@ const SpaceCard: React.FC<SpaceCardProps> = ({ space }) => {
         <div className="space-pricing">
           <div>
             <div className="price-main">
-              {formatPrice(space.price_per_hour)}
+              {/* Spaces quoted per day/week/month show their hourly equivalent */}
+              {formatPrice(space.price_per_hour ?? space.effective_price_per_hour ?? 0)}
               <span className="price-unit">/hour</span>
             </div>
             {space.price_per_day && (
@@ -2,7 +2,12 @@ import React, { useState, useEffect } from 'react';
 import { Search, Plus } from 'lucide-react';
 import SpaceCard from './SpaceCard';
 import SpaceForm from './SpaceForm';
-import { spaceService, type Space, type SpaceQueryParams } from '../services/api';
+import { CARD_FIELDS, spaceService, type Space, type SpaceQueryParams } from '../services/api';
+
+// A burst of new spaces costs one refetch per open page, spread over a few
+// seconds so the pages do not all refetch at the same instant
+const REFRESH_DELAY_MS = 1000;
+const REFRESH_JITTER_MS = 2000;
 
 const SpaceList: React.FC = () => {
   const [spaces, setSpaces] = useState<Space[]>([]);
@@ -32,13 +37,37 @@ const SpaceList: React.FC = () => {
     fetchSpaces();
   }, [filters]);
 
-  const fetchSpaces = async () => {
+  // Keep the page current from the change feed instead of polling
+  useEffect(() => {
+    const { page, per_page, ...filterParams } = filters;
+    let refresh: ReturnType<typeof setTimeout> | undefined;
+    const unsubscribe = spaceService.subscribeToSpaces(filterParams, (change, data) => {
+      if (change === 'updated') {
+        setSpaces(prev => prev.map(space => (space.id === data.id ? (data as Space) : space)));
+      } else if (change === 'deleted' || change === 'removed') {
+        setSpaces(prev => prev.filter(space => space.id !== data.id));
+      } else if (refresh === undefined) {
+        // Where a new space lands depends on sorting and paging
+        refresh = setTimeout(() => {
+          refresh = undefined;
+          fetchSpaces(true);
+        }, REFRESH_DELAY_MS + Math.random() * REFRESH_JITTER_MS);
+      }
+    });
+    return () => {
+      clearTimeout(refresh);
+      unsubscribe();
+    };
+  }, [filters]);
+
+  // In the background, the current page stays on screen until the new one arrives
+  const fetchSpaces = async (background = false) => {
     try {
-      setLoading(true);
+      if (!background) setLoading(true);
       setError(null);
-      const response = await spaceService.getSpaces(filters);
+      const response = await spaceService.getSpaces({ ...filters, fields: CARD_FIELDS });
       setSpaces(response.spaces);
-      setTotalPages(response.total_pages);
+      setTotalPages(response.total_pages ?? 1);
       setCurrentPage(response.page);
     } catch (err) {
       setError('Failed to fetch spaces. Please try again.');
@@ -70,7 +99,7 @@ const SpaceList: React.FC = () => {
   };
 
   const handleSpaceCreated = () => {
-    fetchSpaces(); // Refresh the list after creating a new space
+    // The change feed's 'created' event refreshes the list
   };
 
   const handleCreateSpace = () => {
@@ -96,7 +125,7 @@ const SpaceList: React.FC = () => {
           <div className="error-container">
             <div className="error-message">{error}</div>
             <button
-              onClick={fetchSpaces}
+              onClick={() => fetchSpaces()}
               className="btn-primary"
             >
               Try Again
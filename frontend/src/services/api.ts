@@ -13,10 +13,14 @@ export interface Space {
   state: string;
   zip_code: string;
   country: string;
-  price_per_hour: number;
+  latitude?: number | null;
+  longitude?: number | null;
+  price_per_hour?: number | null;
   price_per_day?: number;
   price_per_week?: number;
   price_per_month?: number;
+  effective_price_per_hour?: number | null;
+  effective_price_per_day?: number | null;
   area_sqft?: number;
   max_capacity?: number;
   amenities: string[];
@@ -26,14 +30,17 @@ export interface Space {
   photos: string[];
   created_at: string;
   updated_at?: string;
+  version: number;
 }
 
 export interface SpaceListResponse {
   spaces: Space[];
-  total: number;
+  total: number | null;
   page: number;
   per_page: number;
-  total_pages: number;
+  total_pages: number | null;
+  next_cursor?: string | null;
+  count_mode: 'exact' | 'estimated' | 'none';
 }
 
 export interface SpaceQueryParams {
@@ -44,10 +51,49 @@ export interface SpaceQueryParams {
   state?: string;
   min_price?: number;
   max_price?: number;
+  price_unit?: 'hour' | 'day';
   is_available?: boolean;
   search?: string;
+  after?: string;
+  near?: string;
+  radius_km?: number;
+  bbox?: string;
+  sort?: 'newest' | 'price_asc' | 'price_desc' | 'area' | 'capacity' | 'distance';
+  amenities?: string;
+  amenities_match?: 'all' | 'any';
+  available_between?: string;
+  count?: 'exact' | 'estimated' | 'none';
+  ids?: string;
+  fields?: string;
 }
 
+// Everything SpaceCard renders; list requests ask for only these columns
+export const CARD_FIELDS = [
+  'title', 'description', 'space_type', 'city', 'state', 'price_per_hour', 'price_per_day',
+  'effective_price_per_hour', 'area_sqft', 'max_capacity', 'amenities', 'is_available', 'photos',
+].join(',');
+
+export interface SpacePhotoResponse {
+  space_id: number;
+  url: string;
+  sha256: string;
+  size: number;
+  content_type: string;
+  thumbnails: Record<number, string>;
+  deduplicated: boolean;
+  photos: string[];
+}
+
+export interface SpaceSuggestion {
+  field: 'city' | 'state' | 'location' | 'title';
+  value: string;
+  count: number;
+}
+
+// 'removed': an update moved the space out of the filters; 'reset': events
+// may have been missed, so refetch
+export type SpaceChange = 'created' | 'updated' | 'deleted' | 'removed' | 'reset';
+
 export interface SpaceCreateData {
   title: string;
   description: string;
@@ -58,6 +104,8 @@ export interface SpaceCreateData {
   state: string;
   zip_code: string;
   country: string;
+  latitude?: number;
+  longitude?: number;
   price_per_hour?: number;
   price_per_day?: number;
   price_per_week?: number;
@@ -73,6 +121,8 @@ export interface SpaceCreateData {
 
 export const api = axios.create({
   baseURL: API_BASE_URL,
+  // Sends the API's write cookie back, so reads right after a write see it
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -89,8 +139,57 @@ export const spaceService = {
     return response.data;
   },
 
+  // Typeahead for the search box; cheap enough to call on every keystroke
+  async suggestSpaces(q: string, limit = 8): Promise<SpaceSuggestion[]> {
+    const response = await api.get('/spaces/suggest', { params: { q, limit } });
+    return response.data.suggestions;
+  },
+
+  // Server-sent change feed for spaces matching the filters; returns a function that closes it
+  subscribeToSpaces(
+    params: SpaceQueryParams,
+    onChange: (change: SpaceChange, data: Space | { id?: number }) => void,
+  ): () => void {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') query.set(key, String(value));
+    });
+    const source = new EventSource(`${API_BASE_URL}/spaces/stream?${query}`);
+    (['created', 'updated', 'deleted', 'removed', 'reset'] as SpaceChange[]).forEach((change) =>
+      source.addEventListener(change, (event) => onChange(change, JSON.parse((event as MessageEvent).data))),
+    );
+    // The browser reconnects on its own, but events sent meanwhile are lost
+    let opened = false;
+    source.onopen = () => {
+      if (opened) onChange('reset', {});
+      opened = true;
+    };
+    return () => source.close();
+  },
+
   async createSpace(spaceData: SpaceCreateData): Promise<Space> {
     const response = await api.post('/spaces', spaceData);
     return response.data;
   },
+
+  // Passing the version read earlier makes the write fail with 412 if the
+  // space changed since, instead of overwriting someone else's edit
+  async updateSpace(id: number, changes: Partial<SpaceCreateData>, version?: number): Promise<Space> {
+    const headers = version === undefined ? {} : { 'If-Match': `"${id}-${version}"` };
+    const response = await api.patch(`/spaces/${id}`, changes, { headers });
+    return response.data;
+  },
+
+  async deleteSpace(id: number, version?: number): Promise<void> {
+    const headers = version === undefined ? {} : { 'If-Match': `"${id}-${version}"` };
+    await api.delete(`/spaces/${id}`, { headers });
+  },
+
+  async uploadSpacePhoto(id: number, file: File): Promise<SpacePhotoResponse> {
+    // The raw file is the body; the server streams it rather than parsing multipart
+    const response = await api.post(`/spaces/${id}/photos`, file, {
+      headers: { 'Content-Type': file.type || 'application/octet-stream' },
+    });
+    return response.data;
+  },
 };
@@ -1,26 +1,112 @@
-"""Database configuration and lifecycle management."""
+"""Database configuration and lifecycle management.
 
+Writes, and the reads of a client that wrote within ``DB_STICKY_SECONDS``,
+go to the primary. Other GET requests read from a healthy replica in
+``DATABASE_REPLICA_URLS`` when there is one. Replica lag is measured
+against the ``table_versions`` counter (migration 0005), so it works the
+same for Postgres streaming replicas and for copies of a SQLite file.
+"""
+
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from fastapi import Depends, Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from sqlalchemy import text
 
 from src.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class Base(DeclarativeBase):
     """Declarative base for ORM models."""
 
 
+class _PoolWaitStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+
+pool_wait_stats = _PoolWaitStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_wait_stats.record(time.perf_counter() - start, timed_out)
+
+
+def _engine_options(database_url: str) -> Dict[str, Any]:
+    url = make_url(database_url)
+    options: Dict[str, Any] = {"echo": settings.DEBUG, "future": True}
+
+    if settings.DB_SERVERLESS:
+        # Each function instance may live for one request: hold no idle
+        # connections and leave pooling to the external pooler
+        options["poolclass"] = NullPool
+    elif url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+
+    if url.get_driver_name() == "asyncpg":
+        # Transaction-mode poolers hand each transaction a different server
+        # connection, so prepared statements cannot be cached there
+        cache_size = 0 if settings.DB_SERVERLESS else settings.DB_STATEMENT_CACHE_SIZE
+        options["connect_args"] = {
+            "prepared_statement_cache_size": cache_size,
+            "statement_cache_size": cache_size,
+        }
+    return options
+
+
 # Engine and session factory
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True,
-)
+engine = create_async_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -28,19 +114,266 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+_VERSION_SQL = text("SELECT version FROM table_versions WHERE name = 'spaces'")
+
+
+class ReplicaSet:
+    """Read replicas in rotation, minus the ones that are down or lagging.
+
+    A background check reads the primary's table version and each
+    replica's. A replica is lagging once it misses a version the primary
+    reached more than ``max_lag`` seconds ago. Failed checks and connection
+    errors take a replica out until a later check succeeds. With no replica
+    usable, reads go to the primary.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], max_lag: float, check_interval: float) -> None:
+        self.engines = engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._usable = list(engines)
+        self._rotation = itertools.count()
+        self._state: Dict[AsyncEngine, Dict[str, Any]] = {
+            replica: {"healthy": True, "lag_seconds": None} for replica in engines
+        }
+        # (primary version, when first seen), oldest first
+        self._versions: Deque[Tuple[int, float]] = deque(maxlen=1024)
+        self._task: Optional["asyncio.Task[None]"] = None
+        for replica in engines:
+            event.listen(replica.sync_engine, "handle_error", self._on_error(replica))
+
+    def pick(self) -> AsyncEngine:
+        """Next usable replica, or the primary engine if there is none."""
+        usable = self._usable
+        if not usable:
+            return engine
+        return usable[next(self._rotation) % len(usable)]
+
+    async def start(self) -> None:
+        if self.engines and self._task is None:
+            await self.check()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def check(self) -> None:
+        """Re-measure every replica's health and lag."""
+        now = time.monotonic()
+        primary_version = await self._version(engine)
+        if not self._versions or self._versions[-1][0] < primary_version:
+            self._versions.append((primary_version, now))
+        for replica in self.engines:
+            state = self._state[replica]
+            try:
+                version = await asyncio.wait_for(self._version(replica), self.check_interval)
+            except Exception as exc:
+                logger.warning("Replica %s unavailable: %r", replica.url, exc)
+                state["healthy"], state["lag_seconds"] = False, None
+                continue
+            state["lag_seconds"] = round(self._lag(version, now), 3)
+            state["healthy"] = state["lag_seconds"] <= self.max_lag
+        self._usable = [replica for replica in self.engines if self._state[replica]["healthy"]]
+
+    @staticmethod
+    async def _version(target: AsyncEngine) -> int:
+        async with target.connect() as conn:
+            return (await conn.execute(_VERSION_SQL)).scalar_one()
+
+    def _lag(self, version: int, now: float) -> float:
+        # Time since the primary first reached a version the replica lacks
+        for primary_version, seen in self._versions:
+            if primary_version > version:
+                return now - seen
+        return 0.0
+
+    def _on_error(self, replica: AsyncEngine):
+        def handle_error(context: Any) -> None:
+            if context.is_disconnect and replica in self._usable:
+                logger.warning("Replica %s disconnected; reading from others", replica.url)
+                self._state[replica]["healthy"] = False
+                self._usable = [r for r in self._usable if r is not replica]
+
+        return handle_error
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Checking replicas failed")
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"url": replica.url.render_as_string(hide_password=True), **self._state[replica]}
+            for replica in self.engines
+        ]
+
+
+replicas = ReplicaSet(
+    [create_async_engine(url, **_engine_options(url)) for url in settings.DATABASE_REPLICA_URLS],
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DB_REPLICA_CHECK_SECONDS,
+)
 
-async def get_db() -> AsyncSession:
-    """FastAPI dependency to provide a database session."""
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware sending a client's reads to the primary right after it writes.
+
+    A successful write sets a cookie with its time. GET requests carrying
+    a cookie younger than ``window`` seconds get ``request.state.read_primary``.
+    The cookie works across workers. Clients without cookies do not get
+    read-your-writes.
+    """
+
+    def __init__(self, app: Any, window: float, cookie: str = "db_last_write") -> None:
+        self.app = app
+        self.window = window
+        self.cookie = cookie
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] in ("GET", "HEAD"):
+            if self._wrote_recently(scope):
+                scope.setdefault("state", {})["read_primary"] = True
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{self.cookie}={time.time():.3f}; Max-Age={math.ceil(self.window)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", ()), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _wrote_recently(self, scope: Dict[str, Any]) -> bool:
+        for key, value in scope["headers"]:
+            if key == b"cookie":
+                morsel = SimpleCookie(value.decode("latin-1")).get(self.cookie)
+                if morsel is not None:
+                    try:
+                        return time.time() - float(morsel.value) < self.window
+                    except ValueError:
+                        return False
+        return False
+
+
+def reads_from_primary(request: Request) -> bool:
+    """Whether this request must see the primary: a write, or a read just after one."""
+    return request.method not in ("GET", "HEAD") or getattr(request.state, "read_primary", False)
+
+
+def read_session(primary: bool = False) -> AsyncSession:
+    """A session on a usable replica (or the primary, if asked or none is usable)."""
+    return AsyncSessionLocal(bind=engine if primary else replicas.pick())
+
+
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency: a replica session for reads, the primary for writes."""
+    async with read_session(reads_from_primary(request)) as session:
+        yield session
+
+
+async def get_primary_db(db: AsyncSession = Depends(get_db)) -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency: a primary session, ``get_db``'s own when that is one."""
+    if db.bind is engine:
+        yield db
+        return
     async with AsyncSessionLocal() as session:
         yield session
 
 
-async def init_db() -> None:
-    """Create database tables on startup if they do not exist."""
-    # Import models here so metadata is registered
-    from src.models.space import Space  # noqa: F401
+def pool_status() -> Dict[str, Any]:
+    """Snapshot of the engine's connection pool, checkout wait times and replicas."""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    waits = pool_wait_stats
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            checkouts=waits.checkouts,
+            timeouts=waits.timeouts,
+            wait_seconds_total=round(waits.wait_total, 6),
+            wait_seconds_avg=round(waits.wait_total / waits.checkouts, 6) if waits.checkouts else 0.0,
+            wait_seconds_max=round(waits.wait_max, 6),
+        )
+    if replicas.engines:
+        stats["replicas"] = replicas.status()
+    return stats
+
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+def _upgrade(connection: Connection) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
+
+# Any constant works; it only has to be the same in every process
+_MIGRATION_LOCK_ID = 0x5370616365
 
+
+async def run_migrations() -> None:
+    """Apply pending Alembic migrations (``alembic upgrade head``) in-process.
+
+    On Postgres concurrent callers (e.g. serverless cold starts) take turns
+    under an advisory lock; the later ones find the schema at head.
+    """
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _MIGRATION_LOCK_ID})
+        await conn.run_sync(_upgrade)
+
+
+async def has_schema_object(conn: AsyncConnection, name: str) -> bool:
+    """Whether a table or index called ``name`` exists."""
+    if conn.dialect.name == "postgresql":
+        result = await conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+        return bool(result.scalar())
+    if conn.dialect.name == "sqlite":
+        result = await conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": name}
+        )
+        return result.first() is not None
+    return False
+
+
+async def init_db() -> None:
+    """Prepare the app for an already-migrated database.
+
+    The schema is owned by Alembic; startup only applies migrations when
+    ``DB_MIGRATE_ON_STARTUP`` is set, then checks which optional indexes exist.
+    """
+    from src.services.amenities import detect_amenity_index
+    from src.services.availability import detect_availability_index
+    from src.services.search import detect_search_index
 
+    if settings.DB_MIGRATE_ON_STARTUP:
+        await run_migrations()
 
+    async with engine.connect() as conn:
+        await detect_search_index(conn)
+        await detect_amenity_index(conn)
+        await detect_availability_index(conn)
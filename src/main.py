@@ -1,20 +1,33 @@
 """FastAPI application entrypoint for Space Rental API."""
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from pathlib import Path
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
 from src.config import settings
-from src.database import init_db
+from src.database import ReadYourWritesMiddleware, engine, init_db, pool_status, replicas
 from src.routers import spaces
+from src.services import admission, compression, http_cache, metrics, photos
+from src.services.events import space_events
+from src.services.suggest import suggest_index
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    await replicas.start()
+    if settings.SUGGEST_IN_MEMORY:
+        await suggest_index.load()
+    space_events.start()
     yield
     # Shutdown
+    await space_events.stop()
+    await replicas.stop()
+    photos.shutdown()
 
 
 app = FastAPI(
@@ -24,6 +37,20 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+if settings.ADMISSION_ENABLED:
+    # Innermost: rejections still get CORS headers and show up in the metrics
+    app.add_middleware(
+        admission.AdmissionMiddleware,
+        prefix="/api/v1/spaces",
+        limits=settings.ADMISSION_LIMITS,
+        rate_limits=settings.ADMISSION_RATE_LIMITS,
+        client_header=settings.ADMISSION_CLIENT_HEADER,
+        retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+    )
+
+if settings.DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware, window=settings.DB_STICKY_SECONDS)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
@@ -32,8 +59,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(http_cache.CacheControlMiddleware, policies=settings.CACHE_CONTROL)
+
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine.sync_engine)
+    for replica in replicas.engines:
+        metrics.instrument_engine(replica.sync_engine)
+    # Streams stay open for minutes and would skew the latency histograms
+    app.add_middleware(
+        metrics.MetricsMiddleware, exclude_paths={"/metrics", "/api/v1/spaces/stream"}
+    )
+
+if settings.COMPRESSION_ENABLED:
+    # Added last, so it is outermost and compresses every other layer's output
+    app.add_middleware(
+        compression.CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
 app.include_router(spaces.router, prefix="/api/v1", tags=["spaces"])
 
+if settings.STORAGE_BACKEND == "local":
+    # Only stored photos, not the upload spool next to them
+    app.mount(
+        f"{settings.UPLOAD_URL_PREFIX}/{photos.PHOTO_PREFIX}",
+        StaticFiles(directory=Path(settings.UPLOAD_DIR) / photos.PHOTO_PREFIX, check_dir=False),
+        name="photos",
+    )
+
 
 @app.get("/")
 async def root() -> dict:
@@ -45,3 +100,13 @@ async def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/health/db-pool")
+async def db_pool() -> dict:
+    return pool_status()
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics() -> Response:
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
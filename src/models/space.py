@@ -1,26 +1,69 @@
 """SQLAlchemy ORM model for Space."""
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    Float,
+    ForeignKey,
+    Index,
     Integer,
+    JSON,
     Numeric,
     String,
     Text,
+    literal_column,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 
 from src.database import Base
 
 
+# Lists of strings; SQL NULL (not JSON null) when absent
+JsonList = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Space(Base):
     __tablename__ = "spaces"
+    # The schema is managed by Alembic (alembic/versions); keep these in step
+    __table_args__ = (
+        # Backs keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_spaces_created_at_id", "created_at", "id"),
+        Index("ix_spaces_external_id", "external_id", unique=True),
+        # Listing query shapes; see alembic/versions/0003_query_shape_indexes.py
+        Index(
+            "ix_spaces_available_newest",
+            "created_at",
+            "id",
+            postgresql_where=text("is_available = true"),
+            sqlite_where=text("is_available = 1"),
+        ),
+        Index("ix_spaces_type_available_newest", "space_type", "is_available", "created_at", "id"),
+        # Price filters and sorts; see alembic/versions/0004_effective_prices.py
+        Index("ix_spaces_effective_price", "effective_price_per_hour", "id"),
+        Index("ix_spaces_effective_price_day", "effective_price_per_day"),
+        Index(
+            "ix_spaces_available_price",
+            "effective_price_per_hour",
+            "id",
+            postgresql_where=text("is_available = true"),
+            sqlite_where=text("is_available = 1"),
+        ),
+        Index("ix_spaces_type_price", "space_type", "effective_price_per_hour", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    # Partner-feed key used for bulk upserts
+    external_id = Column(String(100), nullable=True)
     title = Column(String(200), nullable=False, index=True)
     description = Column(Text, nullable=False)
     space_type = Column(String(50), nullable=False)
@@ -31,28 +74,70 @@ class Space(Base):
     zip_code = Column(String(20), nullable=False)
     country = Column(String(50), default="US")
 
-    price_per_hour = Column(Numeric(10, 2), nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    # Derived from latitude/longitude on write; see src/services/geo.py
+    geohash = Column(String(12), nullable=True, index=True)
+
+    # Exactly one of these is set, in the unit the host quotes
+    price_per_hour = Column(Numeric(10, 2), nullable=True)
     price_per_day = Column(Numeric(10, 2), nullable=True)
     price_per_week = Column(Numeric(10, 2), nullable=True)
     price_per_month = Column(Numeric(10, 2), nullable=True)
+    # The quoted price converted to common units on write, for filtering and
+    # sorting across units; see src/services/pricing.py
+    effective_price_per_hour = Column(Numeric(12, 4), nullable=True)
+    effective_price_per_day = Column(Numeric(12, 4), nullable=True)
 
     area_sqft = Column(Integer, nullable=True)
     max_capacity = Column(Integer, nullable=True)
-    amenities = Column(Text, nullable=True)  # JSON-encoded list
+    # JSONB with a GIN index on Postgres; see src/services/amenities.py
+    amenities = Column(JsonList, nullable=True)
 
-    is_available = Column(Boolean, default=True, index=True)
+    is_available = Column(Boolean, default=True)
     available_from = Column(DateTime, nullable=True)
     available_until = Column(DateTime, nullable=True)
 
-    photos = Column(Text, nullable=True)  # JSON-encoded list
+    photos = Column(JsonList, nullable=True)
 
     # Placeholder for future user relation
     host_id = Column(Integer, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Python-side default keeps the stored precision identical to the values
+    # bound from pagination cursors (SQLite's CURRENT_TIMESTAMP drops microseconds)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Incremented by every write; the ETag, and the If-Match precondition for
+    # optimistic concurrency (see SpaceService.update_space)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     def __repr__(self) -> str:  # pragma: no cover - debug helper
         return f"<Space id={self.id} title={self.title!r} type={self.space_type!r}>"
 
 
+# Sort keys for sort=area and sort=capacity: unknown sizes count as 0, so they
+# come last in descending order and keyset cursors never compare NULLs.
+# Queries must use these exact expressions to match the indexes below.
+AREA_SORT_KEY = func.coalesce(Space.area_sqft, literal_column("0"))
+CAPACITY_SORT_KEY = func.coalesce(Space.max_capacity, literal_column("0"))
+
+Index("ix_spaces_area", AREA_SORT_KEY, Space.id)
+Index("ix_spaces_capacity", CAPACITY_SORT_KEY, Space.id)
+
+
+class SpaceAvailability(Base):
+    """A window during which a space can be booked.
+
+    Windows of one space never overlap or touch: they are merged on write, so
+    "free for the whole of [start, end)" is a containment test on one row.
+    Times are stored in UTC. The interval index lives in
+    src/services/availability.py.
+    """
+
+    __tablename__ = "space_availability"
+    __table_args__ = (Index("ix_space_availability_space_id_starts_at", "space_id", "starts_at"),)
+
+    id = Column(Integer, primary_key=True)
+    space_id = Column(Integer, ForeignKey("spaces.id", ondelete="CASCADE"), nullable=False)
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=False)
@@ -2,155 +2,536 @@
 
 import logging
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database import get_db
+from src.config import settings
+from src.database import get_db, get_primary_db, read_session, reads_from_primary
 from src.schemas.space import (
+    CountMode,
+    SpaceAvailabilityResponse,
+    SpaceAvailabilityUpdate,
+    SpaceBulkRequest,
+    SpaceBulkResponse,
     SpaceCreate,
+    SpaceFacetsResponse,
     SpaceListResponse,
+    SpacePhotoResponse,
     SpaceQueryParams,
     SpaceResponse,
+    SpaceSuggestResponse,
     SpaceUpdate,
 )
-from src.services.space_service import SpaceService, _parse_json_field
+from src.services import http_cache, photos, suggest
+from src.services.cache import ListingCache, facet_cache, listing_cache
+from src.services.events import space_events
+from src.services.export import EXPORT_FIELDS, csv_stream, ndjson_stream
+from src.services.loaders import primary_space_loader, space_loader_for
+from src.services.serialization import FastJSONResponse, dumps, space_to_dict
+from src.services.space_service import DuplicateExternalId, SpaceService, VersionConflict
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/spaces", response_model=SpaceListResponse)
-async def get_spaces(
-    page: int = Query(1, ge=1),
-    per_page: int = Query(10, ge=1, le=100),
+def _validated_params(**kwargs: Any) -> SpaceQueryParams:
+    try:
+        return SpaceQueryParams(**kwargs)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False, include_context=False))
+
+
+def _parse_ids(raw: str) -> List[int]:
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be comma-separated integers",
+        )
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.MAX_IDS_PER_REQUEST:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.MAX_IDS_PER_REQUEST} ids per request",
+        )
+    return ids
+
+
+def filter_params(
     space_type: Optional[str] = Query(None),
     city: Optional[str] = Query(None),
     state: Optional[str] = Query(None),
     min_price: Optional[Decimal] = Query(None, ge=0),
     max_price: Optional[Decimal] = Query(None, ge=0),
+    price_unit: Literal["hour", "day"] = Query(
+        "hour", description="Unit of min_price/max_price; spaces quoted in any unit are compared"
+    ),
     is_available: Optional[bool] = Query(None),
     search: Optional[str] = Query(None),
+    near: Optional[str] = Query(None, description="lat,lon"),
+    radius_km: float = Query(10, gt=0, le=500),
+    bbox: Optional[str] = Query(None, description="min_lat,min_lon,max_lat,max_lon"),
+    amenities: Optional[str] = Query(None, description="Comma-separated, e.g. WiFi,Parking"),
+    amenities_match: Literal["all", "any"] = Query("all"),
+    available_between: Optional[str] = Query(
+        None, description="start,end (ISO 8601); free for the whole range"
+    ),
+) -> Dict[str, Any]:
+    """Filter query parameters shared by every endpoint that selects spaces."""
+    return {
+        "space_type": space_type,
+        "city": city,
+        "state": state,
+        "min_price": min_price,
+        "max_price": max_price,
+        "price_unit": price_unit,
+        "is_available": is_available,
+        "search": search,
+        "near": near,
+        "radius_km": radius_km,
+        "bbox": bbox,
+        "amenities": amenities,
+        "amenities_match": amenities_match,
+        "available_between": available_between,
+    }
+
+
+async def _conditional_listing(
+    request: Request,
+    db: AsyncSession,
+    primary: AsyncSession,
+    params: SpaceQueryParams,
+    cache: Optional[ListingCache],
+    load: Callable[[AsyncSession], Awaitable[bytes]],
+    variant: Optional[Dict[str, Any]] = None,
+) -> Response:
+    """Serve a listing body with its ETag, or 304 when the client's copy is current.
+
+    Cached bodies carry the ETag they were built under, so a hit runs no query.
+    On a miss with If-None-Match the primary's table version decides a 304
+    before ``load`` runs. ``load`` reads from ``db`` unless that is a replica
+    behind the version the body is tagged with.
+    """
+    route = request.scope["route"].name
+    params_key = {**params.model_dump(mode="json"), "variant": variant}
+
+    if cache is not None:
+        cached = await cache.get(params, variant)
+        if cached is not None:
+            etag, body = http_cache.unpack(cached)
+            if http_cache.if_none_match(request, etag):
+                return http_cache.not_modified(etag)
+            return Response(content=body, media_type=FastJSONResponse.media_type, headers={"ETag": etag})
+
+    version = None
+    if "if-none-match" in request.headers:
+        version = await http_cache.table_version(primary)
+        etag = http_cache.listing_etag(version, route, params_key)
+        if http_cache.if_none_match(request, etag):
+            return http_cache.not_modified(etag)
+
+    async def render(version: Optional[int] = None) -> bytes:
+        if version is None:
+            # Re-read once the cache has registered the group: a write that
+            # commits after this point invalidates the entry being built
+            version = await http_cache.table_version(primary)
+        session = db
+        if db is not primary and await http_cache.table_version(db) < version:
+            # The replica lacks writes the ETag (and cache entry) would claim
+            session = primary
+        return http_cache.pack(http_cache.listing_etag(version, route, params_key), await load(session))
+
+    if cache is None:
+        packed = await render(version)
+    else:
+        # Cache hits skip both queries and all response building
+        packed = await cache.get_or_load(params, render, variant=variant)
+    etag, body = http_cache.unpack(packed)
+    return Response(content=body, media_type=FastJSONResponse.media_type, headers={"ETag": etag})
+
+
+@router.get("/spaces", response_model=SpaceListResponse)
+async def get_spaces(
+    request: Request,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(10, ge=1, le=100),
+    after: Optional[str] = Query(None, description="Keyset cursor from a previous `next_cursor`"),
+    sort: str = Query(
+        "newest",
+        description="newest, price_asc, price_desc, area, capacity, or distance (requires near)",
+    ),
+    count: CountMode = Query("exact", description="exact, estimated, or none to skip counting"),
+    ids: Optional[str] = Query(
+        None, description="Comma-separated ids; returns those spaces in this order, without filters"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated response fields, e.g. id,title,city,price_per_hour"
+    ),
+    filters: Dict[str, Any] = Depends(filter_params),
     db: AsyncSession = Depends(get_db),
+    primary: AsyncSession = Depends(get_primary_db),
 ):
-    params = SpaceQueryParams(
+    params = _validated_params(
+        **filters,
         page=page,
         per_page=per_page,
-        space_type=space_type,
-        city=city,
-        state=state,
-        min_price=min_price,
-        max_price=max_price,
-        is_available=is_available,
-        search=search,
+        after=after,
+        sort=sort,
+        count=count,
+        fields=fields,
     )
+    if ids is not None:
+        return await _get_spaces_by_ids(request, db, primary, params, _parse_ids(ids))
 
-    service = SpaceService(db)
-    spaces, total = await service.get_spaces(params)
-
-    items = []
-    for s in spaces:
-        items.append(
-            SpaceResponse(
-                id=s.id,
-                title=s.title,
-                description=s.description,
-                space_type=s.space_type,
-                location=s.location,
-                address=s.address,
-                city=s.city,
-                state=s.state,
-                zip_code=s.zip_code,
-                country=s.country,
-                price_per_hour=s.price_per_hour,
-                price_per_day=s.price_per_day,
-                price_per_week=s.price_per_week,
-                price_per_month=s.price_per_month,
-                area_sqft=s.area_sqft,
-                max_capacity=s.max_capacity,
-                amenities=_parse_json_field(s.amenities),
-                is_available=s.is_available,
-                available_from=s.available_from,
-                available_until=s.available_until,
-                photos=_parse_json_field(s.photos),
-                created_at=s.created_at,
-                updated_at=s.updated_at,
-            )
+    async def load(session: AsyncSession) -> bytes:
+        service = SpaceService(session)
+        try:
+            spaces, total, next_cursor, count_mode = await service.get_spaces(params)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+        total_pages = None if total is None else (total + per_page - 1) // per_page
+        return dumps(
+            {
+                "spaces": [space_to_dict(space, params.fields) for space in spaces],
+                "total": total,
+                "page": page,
+                "per_page": per_page,
+                "total_pages": total_pages,
+                "next_cursor": next_cursor,
+                "count_mode": count_mode,
+            }
         )
 
-    total_pages = (total + per_page - 1) // per_page
-    return SpaceListResponse(
-        spaces=items,
-        total=total,
-        page=page,
-        per_page=per_page,
-        total_pages=total_pages,
+    return await _conditional_listing(request, db, primary, params, listing_cache, load)
+
+
+async def _get_spaces_by_ids(
+    request: Request,
+    db: AsyncSession,
+    primary: AsyncSession,
+    params: SpaceQueryParams,
+    ids: List[int],
+) -> Response:
+    if params.active_filters() or params.after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids cannot be combined with filters or a cursor",
+        )
+
+    async def load(session: AsyncSession) -> bytes:
+        loader = primary_space_loader if session is primary else space_loader_for(request)
+        spaces = [space for space in await loader.load_many(ids) if space is not None]
+        return dumps(
+            {
+                "spaces": [space_to_dict(space, params.fields) for space in spaces],
+                "total": len(spaces),
+                "page": 1,
+                "per_page": len(ids),
+                "total_pages": 1,
+                "next_cursor": None,
+                "count_mode": "exact",
+            }
+        )
+
+    return await _conditional_listing(
+        request, db, primary, params, None, load, variant={"ids": ids}
+    )
+
+
+@router.get("/spaces/facets", response_model=SpaceFacetsResponse)
+async def get_space_facets(
+    request: Request,
+    facets: Optional[str] = Query(None, description="Comma-separated subset of the configured facets"),
+    filters: Dict[str, Any] = Depends(filter_params),
+    db: AsyncSession = Depends(get_db),
+    primary: AsyncSession = Depends(get_primary_db),
+):
+    params = _validated_params(**filters)
+    requested = [f.strip() for f in facets.split(",") if f.strip()] if facets else settings.FACET_FIELDS
+    unknown = sorted(set(requested) - set(settings.FACET_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown facets: {', '.join(unknown)}",
+        )
+
+    async def load(session: AsyncSession) -> bytes:
+        service = SpaceService(session)
+        total, counts = await service.get_facets(params, requested)
+        return dumps(
+            {
+                "total": total,
+                "facets": {
+                    name: [{"value": value, "count": count} for value, count in pairs]
+                    for name, pairs in counts.items()
+                },
+            }
+        )
+
+    return await _conditional_listing(
+        request, db, primary, params, facet_cache, load, variant={"facets": requested}
+    )
+
+
+@router.get("/spaces/suggest", response_model=SpaceSuggestResponse)
+async def get_space_suggestions(
+    q: str = Query(..., min_length=1, max_length=100, description="What the user typed so far"),
+    limit: int = Query(8, ge=1, le=settings.SUGGEST_MAX_LIMIT),
+    db: AsyncSession = Depends(get_db),
+):
+    if suggest.suggest_index.loaded:
+        suggestions = suggest.suggest_index.search(q, limit)
+    else:
+        suggestions = await suggest.search_database(db, q, limit)
+    return FastJSONResponse(
+        {"query": q, "suggestions": [suggestion._asdict() for suggestion in suggestions]}
+    )
+
+
+@router.get("/spaces/stream")
+async def stream_space_events(filters: Dict[str, Any] = Depends(filter_params)):
+    """Server-sent ``created``/``updated``/``deleted`` events for spaces matching the filters.
+
+    ``removed`` means an update moved a space out of the filters. Filters
+    that cannot be checked against a single row (``search``,
+    ``available_between``) do not narrow the feed. After a ``reset`` event
+    or a reconnect, events may have been missed: refetch the listing.
+    """
+    params = _validated_params(**filters)
+    subscription = space_events.subscribe(params)
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open streams",
+            headers={"Retry-After": "30"},
+        )
+
+    async def frames():
+        try:
+            # Sent at once, so the client (and any proxy) sees the stream open
+            yield b"retry: 3000\n\n"
+            while True:
+                data = await subscription.next(settings.EVENTS_HEARTBEAT_SECONDS)
+                if data is None:
+                    yield b"event: reset\ndata: {}\n\n"
+                    return
+                yield data or b": keepalive\n\n"
+        finally:
+            space_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        frames(), media_type="text/event-stream", headers={"X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/spaces/export")
+async def export_spaces(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    filters: Dict[str, Any] = Depends(filter_params),
+):
+    params = _validated_params(**filters)
+
+    # The stream outlives this handler, and get_db's session is closed before
+    # the body is sent, so the generator owns its own session.
+    async def batches():
+        async with read_session(reads_from_primary(request)) as session:
+            service = SpaceService(session)
+            async for batch in service.stream_spaces(
+                params, EXPORT_FIELDS, batch_size=settings.EXPORT_BATCH_SIZE
+            ):
+                yield batch
+
+    if format == "csv":
+        body, media_type = csv_stream(batches()), "text/csv"
+    else:
+        body, media_type = ndjson_stream(batches()), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="spaces.{format}"'},
     )
 
 
+@router.get("/spaces/{space_id}", response_model=SpaceResponse)
+async def get_space(space_id: int, request: Request):
+    # Concurrent lookups share one IN query on the loader's own session
+    space = await space_loader_for(request).load(space_id)
+    if space is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    etag = http_cache.space_etag(space)
+    if http_cache.if_none_match(request, etag):
+        return http_cache.not_modified(etag)
+    return FastJSONResponse(space_to_dict(space), headers={"ETag": etag})
+
+
 @router.post("/spaces", response_model=SpaceResponse, status_code=status.HTTP_201_CREATED)
 async def create_space(space_data: SpaceCreate, db: AsyncSession = Depends(get_db)):
     service = SpaceService(db)
-    space = await service.create_space(space_data)
-    return SpaceResponse(
-        id=space.id,
-        title=space.title,
-        description=space.description,
-        space_type=space.space_type,
-        location=space.location,
-        address=space.address,
-        city=space.city,
-        state=space.state,
-        zip_code=space.zip_code,
-        country=space.country,
-        price_per_hour=space.price_per_hour,
-        price_per_day=space.price_per_day,
-        price_per_week=space.price_per_week,
-        price_per_month=space.price_per_month,
-        area_sqft=space.area_sqft,
-        max_capacity=space.max_capacity,
-        amenities=_parse_json_field(space.amenities),
-        is_available=space.is_available,
-        available_from=space.available_from,
-        available_until=space.available_until,
-        photos=_parse_json_field(space.photos),
-        created_at=space.created_at,
-        updated_at=space.updated_at,
+    try:
+        space = await service.create_space(space_data)
+    except DuplicateExternalId as exc:
+        raise _duplicate_external_id(exc)
+    return FastJSONResponse(
+        space_to_dict(space),
+        status_code=status.HTTP_201_CREATED,
+        headers={"ETag": http_cache.space_etag(space)},
     )
 
 
+@router.post("/spaces/bulk", response_model=SpaceBulkResponse)
+async def bulk_write_spaces(
+    request: SpaceBulkRequest,
+    chunk_size: int = Query(settings.BULK_CHUNK_SIZE, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+):
+    if len(request.items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items per request",
+        )
+    service = SpaceService(db)
+    return await service.bulk_write(request.items, upsert=request.upsert, chunk_size=chunk_size)
+
+
+def _duplicate_external_id(exc: DuplicateExternalId) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+
+def _if_match(request: Request, space_id: int) -> Optional[List[int]]:
+    """Versions the client's If-Match allows a write to replace; None for any."""
+    versions = http_cache.if_match_versions(request, space_id)
+    if versions is None and settings.REQUIRE_IF_MATCH and "if-match" not in request.headers:
+        raise HTTPException(
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            detail="Send the space's ETag in If-Match",
+        )
+    return versions
+
+
+def _version_conflict(space_id: int, exc: VersionConflict) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Space was modified since it was read",
+        headers={"ETag": http_cache.version_etag(space_id, exc.current)},
+    )
+
+
+@router.patch("/spaces/{space_id}", response_model=SpaceResponse)
 @router.put("/spaces/{space_id}", response_model=SpaceResponse)
-async def update_space(space_id: int, space_data: SpaceUpdate, db: AsyncSession = Depends(get_db)):
+async def update_space(
+    space_id: int, space_data: SpaceUpdate, request: Request, db: AsyncSession = Depends(get_db)
+):
+    """Partially update a space; PUT is kept as an alias of PATCH."""
     service = SpaceService(db)
-    space = await service.update_space(space_id, space_data)
+    try:
+        space = await service.update_space(space_id, space_data, _if_match(request, space_id))
+    except VersionConflict as exc:
+        raise _version_conflict(space_id, exc)
+    except DuplicateExternalId as exc:
+        raise _duplicate_external_id(exc)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
     if not space:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
-    return SpaceResponse(
-        id=space.id,
-        title=space.title,
-        description=space.description,
-        space_type=space.space_type,
-        location=space.location,
-        address=space.address,
-        city=space.city,
-        state=space.state,
-        zip_code=space.zip_code,
-        country=space.country,
-        price_per_hour=space.price_per_hour,
-        price_per_day=space.price_per_day,
-        price_per_week=space.price_per_week,
-        price_per_month=space.price_per_month,
-        area_sqft=space.area_sqft,
-        max_capacity=space.max_capacity,
-        amenities=_parse_json_field(space.amenities),
-        is_available=space.is_available,
-        available_from=space.available_from,
-        available_until=space.available_until,
-        photos=_parse_json_field(space.photos),
-        created_at=space.created_at,
-        updated_at=space.updated_at,
-    )
+    return FastJSONResponse(space_to_dict(space), headers={"ETag": http_cache.space_etag(space)})
 
 
+@router.delete("/spaces/{space_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_space(space_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    service = SpaceService(db)
+    try:
+        deleted = await service.delete_space(space_id, _if_match(request, space_id))
+    except VersionConflict as exc:
+        raise _version_conflict(space_id, exc)
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get("/spaces/{space_id}/availability", response_model=SpaceAvailabilityResponse)
+async def get_space_availability(
+    space_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
+    version = await http_cache.table_version(db)
+    etag = http_cache.listing_etag(version, request.scope["route"].name, {"space_id": space_id})
+    if http_cache.if_none_match(request, etag):
+        return http_cache.not_modified(etag)
+
+    service = SpaceService(db)
+    windows = await service.get_availability(space_id)
+    if windows is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    response.headers["ETag"] = etag
+    return SpaceAvailabilityResponse(space_id=space_id, windows=windows)
+
+
+@router.put("/spaces/{space_id}/availability", response_model=SpaceAvailabilityResponse)
+async def set_space_availability(
+    space_id: int,
+    availability: SpaceAvailabilityUpdate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    """Replace a space's windows; If-Match works as for PATCH."""
+    service = SpaceService(db)
+    try:
+        windows = await service.set_availability(
+            space_id, availability.windows, _if_match(request, space_id)
+        )
+    except VersionConflict as exc:
+        raise _version_conflict(space_id, exc)
+    if windows is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    return SpaceAvailabilityResponse(space_id=space_id, windows=windows)
+
+
+@router.post(
+    "/spaces/{space_id}/photos",
+    response_model=SpacePhotoResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"image/*": {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def upload_space_photo(space_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """Upload one image as the raw request body (not multipart form data)."""
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith(("image/", "application/octet-stream")):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send the image as the raw request body with an image/* Content-Type",
+        )
+    declared_size = request.headers.get("content-length", "")
+    if declared_size.isdigit() and int(declared_size) > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Photos are limited to {settings.MAX_FILE_SIZE} bytes",
+        )
+
+    service = SpaceService(db)
+    if await service.get_space_by_id(space_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    # Hand the connection back to the pool while the body streams in
+    await db.rollback()
+
+    try:
+        photo = await photos.store_photo(request.stream())
+    except photos.UploadRejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+
+    space = await service.add_photo(space_id, photo.url)
+    if not space:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    return SpacePhotoResponse(space_id=space_id, photos=space.photos, **photo._asdict())
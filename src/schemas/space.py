@@ -1,13 +1,21 @@
 """Pydantic v2 schemas for Space API."""
 
-from datetime import datetime
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import List, Optional
+from typing import Any, ClassVar, Dict, List, Literal, Optional, Set, Tuple, Union
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
 
+def as_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive input is taken to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
 class SpaceBase(BaseModel):
+    external_id: Optional[str] = Field(None, max_length=100)
     title: str = Field(..., min_length=5, max_length=200)
     description: str = Field(..., min_length=20, max_length=2000)
     space_type: str = Field(..., description="garage, backyard, etc.")
@@ -17,6 +25,8 @@ class SpaceBase(BaseModel):
     state: str = Field(..., min_length=2, max_length=50)
     zip_code: str = Field(..., min_length=5, max_length=20)
     country: str = Field(default="US", max_length=50)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
     price_per_hour: Optional[Decimal] = Field(None, gt=0)
     price_per_day: Optional[Decimal] = Field(None, gt=0)
@@ -69,12 +79,20 @@ class SpaceBase(BaseModel):
         
         return self
 
+    @model_validator(mode='after')
+    def validate_coordinates_together(self):
+        """Latitude and longitude are only meaningful as a pair."""
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude and longitude must be provided together")
+        return self
+
 
 class SpaceCreate(SpaceBase):
     pass
 
 
 class SpaceUpdate(BaseModel):
+    external_id: Optional[str] = Field(None, max_length=100)
     title: Optional[str] = Field(None, min_length=5, max_length=200)
     description: Optional[str] = Field(None, min_length=20, max_length=2000)
     space_type: Optional[str] = None
@@ -84,6 +102,8 @@ class SpaceUpdate(BaseModel):
     state: Optional[str] = Field(None, min_length=2, max_length=50)
     zip_code: Optional[str] = Field(None, min_length=5, max_length=20)
     country: Optional[str] = Field(None, max_length=50)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
     price_per_hour: Optional[Decimal] = Field(None, gt=0)
     price_per_day: Optional[Decimal] = Field(None, gt=0)
@@ -117,9 +137,19 @@ class SpaceUpdate(BaseModel):
             raise ValueError(f"space_type must be one of: {', '.join(sorted(allowed))}")
         return lowered
 
+    @model_validator(mode='after')
+    def validate_coordinates_together(self):
+        """Latitude and longitude are only meaningful as a pair."""
+        if ("latitude" in self.model_fields_set) != ("longitude" in self.model_fields_set):
+            raise ValueError("latitude and longitude must be updated together")
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude and longitude must be provided together")
+        return self
+
 
 class SpaceResponse(BaseModel):
     id: int
+    external_id: Optional[str] = None
     title: str = Field(..., min_length=5, max_length=200)
     description: str = Field(..., min_length=20, max_length=2000)
     space_type: str = Field(..., description="garage, backyard, etc.")
@@ -129,11 +159,15 @@ class SpaceResponse(BaseModel):
     state: str = Field(..., min_length=2, max_length=50)
     zip_code: str = Field(..., min_length=5, max_length=20)
     country: str = Field(default="US", max_length=50)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
     price_per_hour: Optional[Decimal] = Field(None, gt=0)
     price_per_day: Optional[Decimal] = Field(None, gt=0)
     price_per_week: Optional[Decimal] = Field(None, gt=0)
     price_per_month: Optional[Decimal] = Field(None, gt=0)
+    effective_price_per_hour: Optional[Decimal] = None
+    effective_price_per_day: Optional[Decimal] = None
 
     area_sqft: Optional[int] = Field(None, ge=0)
     max_capacity: Optional[int] = Field(None, gt=0)
@@ -146,28 +180,240 @@ class SpaceResponse(BaseModel):
     photos: Optional[List[str]] = Field(default_factory=list)
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = Field(1, description="Incremented by every write; send the ETag in If-Match")
 
     class Config:
         from_attributes = True
 
 
+class AvailabilityWindow(BaseModel):
+    starts_at: datetime
+    ends_at: datetime
+
+    class Config:
+        from_attributes = True
+
+    @field_validator("starts_at", "ends_at")
+    @classmethod
+    def normalize_timezone(cls, value: datetime) -> datetime:
+        return as_utc(value)
+
+    @model_validator(mode='after')
+    def validate_order(self):
+        if self.ends_at <= self.starts_at:
+            raise ValueError("ends_at must be after starts_at")
+        return self
+
+
+class SpaceAvailabilityUpdate(BaseModel):
+    """Replaces every availability window of a space."""
+
+    windows: List[AvailabilityWindow] = Field(..., max_length=1000)
+
+
+class SpaceAvailabilityResponse(BaseModel):
+    space_id: int
+    windows: List[AvailabilityWindow]
+
+
+class SpacePhotoResponse(BaseModel):
+    space_id: int
+    url: str
+    sha256: str
+    size: int
+    content_type: str
+    thumbnails: Dict[int, str] = Field(
+        default_factory=dict, description="Longest side in pixels -> thumbnail URL"
+    )
+    deduplicated: bool = Field(..., description="Identical bytes were already stored")
+    photos: List[str]
+
+
+CountMode = Literal["exact", "estimated", "none"]
+SortMode = Literal["newest", "price_asc", "price_desc", "area", "capacity", "distance"]
+
+
 class SpaceListResponse(BaseModel):
     spaces: List[SpaceResponse]
-    total: int
+    total: Optional[int] = Field(None, description="Null when count_mode is none")
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    count_mode: CountMode = Field(
+        "exact", description="How `total` was obtained; may differ from the requested mode"
+    )
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque token for the next page; pass it back as `after`"
+    )
+
+
+class SpaceBulkRequest(BaseModel):
+    """A batch of creates/updates; items are validated one by one.
+
+    An item with an ``id`` is a partial update (``SpaceUpdate``). Any other item
+    is a ``SpaceCreate``; when it carries an ``external_id`` that already
+    exists and ``upsert`` is on, that row is overwritten instead.
+    """
+
+    items: List[Dict[str, Any]] = Field(..., min_length=1)
+    upsert: bool = True
+
+
+class SpaceBulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "error"]
+    id: Optional[int] = None
+    external_id: Optional[str] = None
+    errors: List[str] = Field(default_factory=list)
+
+
+class SpaceBulkResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[SpaceBulkItemResult]
+
+
+class FacetCount(BaseModel):
+    value: Union[bool, str]
+    count: int
+
+
+class SpaceFacetsResponse(BaseModel):
+    total: int
+    facets: Dict[str, List[FacetCount]]
+
+
+class SpaceSuggestion(BaseModel):
+    field: Literal["city", "state", "location", "title"]
+    value: str
+    count: int = Field(..., description="Spaces with this value")
+
+
+class SpaceSuggestResponse(BaseModel):
+    query: str
+    suggestions: List[SpaceSuggestion]
 
 
 class SpaceQueryParams(BaseModel):
+    # Fields that shape the page or modify another filter, rather than filter rows
+    NON_FILTER_FIELDS: ClassVar[Set[str]] = {
+        "page", "per_page", "after", "count", "sort", "radius_km", "amenities_match", "price_unit",
+        "fields",
+    }
+
     page: int = Field(default=1, ge=1)
     per_page: int = Field(default=10, ge=1, le=100)
+    count: CountMode = "exact"
     space_type: Optional[str] = None
     city: Optional[str] = None
     state: Optional[str] = None
     min_price: Optional[Decimal] = Field(default=None, ge=0)
     max_price: Optional[Decimal] = Field(default=None, ge=0)
+    price_unit: Literal["hour", "day"] = Field(
+        default="hour", description="Unit of min_price/max_price, across all quoted units"
+    )
     is_available: Optional[bool] = None
     search: Optional[str] = None
+    after: Optional[str] = Field(
+        default=None, description="Keyset cursor; when set, `page` is ignored"
+    )
+    near: Optional[Tuple[float, float]] = Field(default=None, description="lat,lon")
+    radius_km: float = Field(default=10, gt=0, le=500)
+    bbox: Optional[Tuple[float, float, float, float]] = Field(
+        default=None, description="min_lat,min_lon,max_lat,max_lon"
+    )
+    amenities: Optional[List[str]] = Field(default=None, description="Amenity names")
+    amenities_match: Literal["all", "any"] = "all"
+    sort: SortMode = "newest"
+    available_between: Optional[Tuple[datetime, datetime]] = Field(
+        default=None,
+        description="start,end; spaces with an availability window covering the whole range",
+    )
+    fields: Optional[List[str]] = Field(
+        default=None, description="SpaceResponse fields to return; id is always included"
+    )
+
+    def active_filters(self) -> Dict[str, Any]:
+        """Row filters that are set to something other than their default."""
+        defaults = type(self).model_fields
+        return {
+            name: value
+            for name, value in self
+            if name not in self.NON_FILTER_FIELDS
+            and value is not None
+            and value != defaults[name].default
+        }
+
+    @field_validator("amenities", mode="before")
+    @classmethod
+    def split_amenities(cls, value):
+        if isinstance(value, str):
+            value = value.split(",")
+        if value is not None:
+            value = [part.strip() for part in value if part.strip()] or None
+        return value
+
+    @field_validator("near", "bbox", mode="before")
+    @classmethod
+    def split_coordinates(cls, value):
+        if isinstance(value, str):
+            return [part.strip() for part in value.split(",")]
+        return value
+
+    @field_validator("available_between", mode="before")
+    @classmethod
+    def split_range(cls, value):
+        if isinstance(value, str):
+            return [part.strip() for part in value.split(",")]
+        return value
+
+    @field_validator("available_between")
+    @classmethod
+    def validate_range(cls, value: Optional[Tuple[datetime, datetime]]):
+        if value is not None:
+            start, end = as_utc(value[0]), as_utc(value[1])
+            if end <= start:
+                raise ValueError("available_between must be start,end with end after start")
+            value = (start, end)
+        return value
+
+    @field_validator("fields", mode="before")
+    @classmethod
+    def split_fields(cls, value):
+        if isinstance(value, str):
+            value = value.split(",")
+        if value is None:
+            return None
+        requested = {part.strip() for part in value if part.strip()}
+        unknown = sorted(requested - set(SpaceResponse.model_fields))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # Canonical order, so equivalent requests share a cache entry
+        return [name for name in SpaceResponse.model_fields if name in requested or name == "id"]
+
+    @field_validator("near")
+    @classmethod
+    def validate_near(cls, value: Optional[Tuple[float, float]]):
+        if value is not None:
+            lat, lon = value
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError("near must be a valid lat,lon pair")
+        return value
+
+    @field_validator("bbox")
+    @classmethod
+    def validate_bbox(cls, value: Optional[Tuple[float, float, float, float]]):
+        if value is not None:
+            min_lat, min_lon, max_lat, max_lon = value
+            if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+                raise ValueError("bbox must be min_lat,min_lon,max_lat,max_lon")
+        return value
+
+    @model_validator(mode='after')
+    def validate_distance_sort(self):
+        if self.sort == "distance" and self.near is None:
+            raise ValueError("sort=distance requires near")
+        return self
 
 
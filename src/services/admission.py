@@ -0,0 +1,211 @@
+"""Admission control: bounded concurrency and queues per route class.
+
+Without it every request waits on the engine's connection pool, however
+long the wait, and a spike turns into a backlog that outlives it. Here each
+class of route (``read`` lookups, ``search`` listings, ``write``) runs at
+most ``concurrency`` requests at a time; up to ``queue`` more wait in FIFO
+order for at most ``timeout`` seconds. Anything beyond that gets an
+immediate ``503`` with ``Retry-After``, while the admitted requests keep
+their latency. Limits are per process.
+
+Optional per-client token buckets (``429``) stop one client's expensive
+searches from using up the search class for everyone else.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from src.services import metrics
+from src.services.serialization import dumps
+
+# Listing endpoints, whose cost grows with filters and result size
+_SEARCH_PATHS = {"", "/facets", "/export"}
+# Long-lived and holds no connection between events; capped on its own
+_EXEMPT_PATHS = {"/stream"}
+
+
+def classify(method: str, path: str, query_string: bytes) -> Optional[str]:
+    """Route class of a request below the spaces prefix; None if unlimited.
+
+    ``path`` is relative to the prefix, e.g. ``/facets`` or ``/42/availability``.
+    """
+    if path in _EXEMPT_PATHS:
+        return None
+    if method not in ("GET", "HEAD"):
+        return "write"
+    if path in _SEARCH_PATHS:
+        if path == "" and any(k == "ids" for k, _ in parse_qsl(query_string.decode("latin-1"))):
+            return "read"  # ?ids= is a batch of primary-key lookups
+        return "search"
+    return "read"
+
+
+class ConcurrencyLimiter:
+    """At most ``concurrency`` holders; ``queue_size`` waiters for up to ``timeout`` seconds."""
+
+    def __init__(self, concurrency: int, queue_size: int, timeout: float) -> None:
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot; False if the queue is full or the wait times out."""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue_size or self.timeout <= 0:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as the wait ended; pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if asyncio.current_task().cancelling():
+                raise
+            return False
+        return True
+
+    def release(self) -> None:
+        # Hand the slot straight to the oldest live waiter, so a newcomer
+        # cannot take it first
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class TokenBuckets:
+    """Per-client token buckets: ``rate`` tokens a second, up to ``burst``.
+
+    Only the ``max_clients`` most recently seen clients are tracked; a
+    forgotten client starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """Spend a token: 0 if there was one, else seconds until there is."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying per-class limits to routes below ``prefix``.
+
+    ``limits`` maps a route class to ``{"concurrency", "queue", "timeout"}``;
+    ``rate_limits`` maps a class to ``[requests per second, burst]`` per
+    client. Clients are told apart by ``client_header`` (e.g.
+    ``x-forwarded-for`` behind a trusted proxy) or else the peer address.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        prefix: str,
+        limits: Dict[str, Dict[str, float]],
+        rate_limits: Optional[Dict[str, Iterable[float]]] = None,
+        client_header: str = "",
+        retry_after: int = 1,
+    ) -> None:
+        self.app = app
+        self.prefix = prefix.rstrip("/")
+        self.limiters = {
+            name: ConcurrencyLimiter(int(limit["concurrency"]), int(limit["queue"]), limit["timeout"])
+            for name, limit in limits.items()
+        }
+        self.buckets = {
+            name: TokenBuckets(*(float(value) for value in limit))
+            for name, limit in (rate_limits or {}).items()
+        }
+        self.client_header = client_header.lower().encode()
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        route_class = classify(
+            scope["method"], path[len(self.prefix):].rstrip("/"), scope.get("query_string", b"")
+        )
+        limiter = self.limiters.get(route_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        buckets = self.buckets.get(route_class)
+        if buckets is not None:
+            wait = buckets.take(self._client(scope))
+            if wait > 0:
+                metrics.admission_rejected.inc(route_class, "rate_limited")
+                await self._reject(send, 429, "Rate limit exceeded", math.ceil(wait))
+                return
+
+        started = time.perf_counter()
+        admitted = await limiter.acquire()
+        metrics.admission_wait.observe(time.perf_counter() - started, route_class)
+        if not admitted:
+            metrics.admission_rejected.inc(route_class, "overloaded")
+            await self._reject(send, 503, "Server busy, retry shortly", self.retry_after)
+            return
+        metrics.admission_active.inc(route_class)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+            metrics.admission_active.dec(route_class)
+
+    def _client(self, scope: Dict[str, Any]) -> str:
+        if self.client_header:
+            for key, value in scope["headers"]:
+                if key == self.client_header:
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    @staticmethod
+    async def _reject(send: Any, status: int, detail: str, retry_after: int) -> None:
+        body = dumps({"detail": detail})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(max(retry_after, 1)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,82 @@
+"""Indexed amenity filtering.
+
+Postgres stores ``amenities`` as JSONB with a ``jsonb_path_ops`` GIN index and
+answers filters with ``@>`` containment. SQLite has no inverted JSON index, so
+triggers keep a normalized ``space_amenities (amenity, space_id)`` side table
+in step with the JSON column and filters probe that instead. Both are created
+by migration 0002; without either index the filter degrades to a text scan of
+the JSON column.
+"""
+
+import logging
+from typing import List, Optional
+
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    String,
+    and_,
+    bindparam,
+    cast,
+    column,
+    or_,
+    text,
+    type_coerce,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.database import has_schema_object
+from src.models.space import Space
+
+logger = logging.getLogger(__name__)
+
+SIDE_TABLE = "space_amenities"
+
+# Set by detect_amenity_index(); None means "scan the JSON text"
+_backend: Optional[str] = None
+
+# Index object whose presence means the migration for each backend has run
+_INDEX_OBJECTS = {"postgresql": "ix_spaces_amenities", "sqlite": SIDE_TABLE}
+
+
+def amenity_backend() -> Optional[str]:
+    return _backend
+
+
+async def detect_amenity_index(conn: AsyncConnection) -> None:
+    """Enable the dialect's amenity index if the migrations created it."""
+    global _backend
+    _backend = None
+
+    name = _INDEX_OBJECTS.get(conn.dialect.name)
+    if name is None or not await has_schema_object(conn, name):
+        logger.info("No amenity index for dialect %s; scanning JSON", conn.dialect.name)
+        return
+    _backend = conn.dialect.name
+
+
+def amenity_clause(amenities: List[str], match: str = "all") -> ColumnElement:
+    """Condition selecting spaces with all (or any) of ``amenities``."""
+    if _backend == "postgresql":
+        # type_coerce gives the JSONB comparator (@>) without emitting a CAST,
+        # so the planner still matches the GIN index
+        jsonb = type_coerce(Space.amenities, JSONB)
+        if match == "all":
+            return jsonb.contains(amenities)
+        # Each containment test is a GIN probe; OR-ed probes become a BitmapOr
+        return or_(*(jsonb.contains([amenity]) for amenity in amenities))
+
+    if _backend == "sqlite":
+        sql = f"SELECT space_id FROM {SIDE_TABLE} WHERE amenity IN :amenities"
+        if match == "all":
+            sql += " GROUP BY space_id HAVING COUNT(*) = :amenity_count"
+        matching_ids = text(sql).bindparams(bindparam("amenities", expanding=True, type_=String))
+        params = {"amenities": amenities}
+        if match == "all":
+            params["amenity_count"] = len(set(amenities))
+        return Space.id.in_(matching_ids.bindparams(**params).columns(column("space_id", Integer)))
+
+    as_text = cast(Space.amenities, String)
+    probes = [as_text.like(f'%"{amenity}"%') for amenity in amenities]
+    return and_(*probes) if match == "all" else or_(*probes)
@@ -0,0 +1,77 @@
+"""Indexed availability search over ``space_availability`` windows.
+
+Postgres indexes ``tstzrange(starts_at, ends_at)`` with GiST and answers
+"free for the whole of [start, end)" with range containment (``@>``). SQLite
+keeps a one-dimensional R*Tree over the windows (as epoch seconds) in step via
+triggers. The R*Tree stores 32-bit floats rounded outward, so it returns a
+superset that the exact comparison on the base table then trims. Both indexes
+are created by migration 0002; without them the comparison runs on its own.
+"""
+
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import ColumnElement, Integer, and_, bindparam, column, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.database import has_schema_object
+from src.models.space import Space, SpaceAvailability
+
+logger = logging.getLogger(__name__)
+
+RTREE_TABLE = "space_availability_rtree"
+
+# Set by detect_availability_index(); None means "compare columns directly"
+_backend: Optional[str] = None
+
+# Index object whose presence means the migration for each backend has run
+_INDEX_OBJECTS = {"postgresql": "ix_space_availability_range", "sqlite": RTREE_TABLE}
+
+
+def availability_backend() -> Optional[str]:
+    return _backend
+
+
+async def detect_availability_index(conn: AsyncConnection) -> None:
+    """Enable the dialect's interval index if the migrations created it."""
+    global _backend
+    _backend = None
+
+    name = _INDEX_OBJECTS.get(conn.dialect.name)
+    if name is None or not await has_schema_object(conn, name):
+        logger.info("No availability index for dialect %s; comparing columns", conn.dialect.name)
+        return
+    _backend = conn.dialect.name
+
+
+def availability_clause(start: datetime, end: datetime) -> ColumnElement:
+    """Condition selecting spaces with one window covering all of [start, end)."""
+    if _backend == "postgresql":
+        covering = func.tstzrange(SpaceAvailability.starts_at, SpaceAvailability.ends_at).op("@>")(
+            func.tstzrange(start, end)
+        )
+    else:
+        covering = and_(SpaceAvailability.starts_at <= start, SpaceAvailability.ends_at >= end)
+        if _backend == "sqlite":
+            candidates = text(
+                f"SELECT id FROM {RTREE_TABLE} WHERE starts <= :window_start AND ends >= :window_end"
+            ).bindparams(
+                bindparam("window_start", start.timestamp()),
+                bindparam("window_end", end.timestamp()),
+            )
+            covering = and_(
+                SpaceAvailability.id.in_(candidates.columns(column("id", Integer))), covering
+            )
+    return Space.id.in_(select(SpaceAvailability.space_id).where(covering))
+
+
+def merge_windows(windows: Iterable[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """Sort windows and merge any that overlap or touch."""
+    merged: List[Tuple[datetime, datetime]] = []
+    for starts_at, ends_at in sorted(windows):
+        if merged and starts_at <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], ends_at))
+        else:
+            merged.append((starts_at, ends_at))
+    return merged
@@ -0,0 +1,428 @@
+"""Read-through cache for space listing responses.
+
+Entries hold the serialized ``SpaceListResponse`` body, keyed on the
+normalized ``SpaceQueryParams``. Keys are split into a *filter group* (every
+filter) and a *page* part (``page``/``per_page``/``after``), and each group
+carries a generation number. A write looks up the registered groups, checks
+which of them the old or new version of the row could appear in, and moves
+only those to a new generation; stale entries then age out through TTL/LRU.
+Generations come from one counter per cache, so a group never returns to
+a number it had before, even after its generation key expires or is dropped.
+
+Backends speak a small subset of Redis commands, so the in-process LRU store
+and a Redis client are interchangeable.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple
+
+from src.config import settings
+from src.schemas.space import SpaceQueryParams
+from src.services import geo, http_cache
+
+logger = logging.getLogger(__name__)
+
+# Query params that select a page or its rendering rather than a result set
+PAGE_FIELDS = {"page", "per_page", "after", "count", "fields"}
+# Filters that write invalidation can evaluate against a row; any other
+# filter present in a group makes that group invalidate on every write.
+SNAPSHOT_FIELDS = (
+    "space_type",
+    "city",
+    "state",
+    "effective_price_per_hour",
+    "effective_price_per_day",
+    "is_available",
+    "latitude",
+    "longitude",
+    "amenities",
+)
+_PARAM_DEFAULTS = SpaceQueryParams().model_dump(mode="json")
+# Generations outlive their entries; a group whose key is lost just starts afresh
+_GENERATION_TTL = 24 * 3600.0
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    async def incr(self, key: str) -> int: ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+    async def hset(self, name: str, key: str, value: bytes) -> None: ...
+
+    async def hgetall(self, name: str) -> Dict[str, bytes]: ...
+
+    async def hdel(self, name: str, *keys: str) -> None: ...
+
+
+class MemoryCacheBackend:
+    """In-process backend: TTL expiry plus LRU eviction past ``max_entries``."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._hashes: Dict[str, Dict[str, bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key in self._counters:
+            return str(self._counters[key]).encode()
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+            self._counters.pop(key, None)
+
+    async def hset(self, name: str, key: str, value: bytes) -> None:
+        self._hashes.setdefault(name, {})[key] = value
+
+    async def hgetall(self, name: str) -> Dict[str, bytes]:
+        return dict(self._hashes.get(name, {}))
+
+    async def hdel(self, name: str, *keys: str) -> None:
+        fields = self._hashes.get(name, {})
+        for key in keys:
+            fields.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._counters.clear()
+        self._hashes.clear()
+
+
+class RedisCacheBackend:
+    """Adapter over a ``redis.asyncio`` client.
+
+    Eviction is left to the server; run it with ``maxmemory-policy allkeys-lru``.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def incr(self, key: str) -> int:
+        return int(await self._client.incr(key))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    async def hset(self, name: str, key: str, value: bytes) -> None:
+        await self._client.hset(name, key, value)
+
+    async def hgetall(self, name: str) -> Dict[str, bytes]:
+        raw = await self._client.hgetall(name)
+        return {k.decode() if isinstance(k, bytes) else k: v for k, v in raw.items()}
+
+    async def hdel(self, name: str, *keys: str) -> None:
+        if keys:
+            await self._client.hdel(name, *keys)
+
+
+def _normalize(params: SpaceQueryParams) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split params into (filter group, page selector) with canonical values."""
+    data = params.model_dump(mode="json")
+    for field in ("city", "state", "search"):
+        if data.get(field):
+            # All three are matched case-insensitively
+            data[field] = data[field].strip().lower()
+    group = {k: v for k, v in data.items() if k not in PAGE_FIELDS}
+    page = {k: v for k, v in data.items() if k in PAGE_FIELDS}
+    return group, page
+
+
+def _digest(value: Dict[str, Any]) -> str:
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def filter_group(params: SpaceQueryParams) -> Tuple[str, Dict[str, Any]]:
+    """(id, filter group) of ``params``, for matching rows with ``group_matches``."""
+    group, _ = _normalize(params)
+    return _digest(group), group
+
+
+def snapshot(space: Any) -> Dict[str, Any]:
+    """Capture the row fields invalidation needs to match against filter groups."""
+    return {field: getattr(space, field) for field in SNAPSHOT_FIELDS}
+
+
+def group_matches(group: Dict[str, Any], row: Dict[str, Any]) -> bool:
+    """Could ``row`` appear in (or vanish from) a listing filtered by ``group``?
+
+    Errs on the side of True: filters we cannot evaluate in Python, such as
+    full-text search, always match.
+    """
+    for field, value in group.items():
+        if value is None or value == _PARAM_DEFAULTS.get(field):
+            continue
+        if field == "space_type":
+            if row["space_type"] != value:
+                return False
+        elif field in ("city", "state"):
+            if value not in (row[field] or "").lower():
+                return False
+        elif field in ("min_price", "max_price"):
+            price = row[f"effective_price_per_{group['price_unit']}"]
+            if price is None:
+                return False
+            if field == "min_price" and float(price) < float(value):
+                return False
+            if field == "max_price" and float(price) > float(value):
+                return False
+        elif field == "is_available":
+            if row["is_available"] != value:
+                return False
+        elif field in ("bbox", "near"):
+            if row["latitude"] is None or row["longitude"] is None:
+                return False
+            box = (
+                geo.BoundingBox(*value)
+                if field == "bbox"
+                else geo.radius_box(value[0], value[1], group["radius_km"])
+            )
+            if not (
+                box.min_lat <= row["latitude"] <= box.max_lat
+                and box.min_lon <= row["longitude"] <= box.max_lon
+            ):
+                return False
+        elif field == "amenities":
+            wanted, present = set(value), set(row["amenities"] or [])
+            if group["amenities_match"] == "any":
+                if not wanted & present:
+                    return False
+            elif not wanted <= present:
+                return False
+        elif field in ("sort", "radius_km", "amenities_match", "price_unit"):
+            continue
+        else:
+            return True
+    return True
+
+
+class ListingCache:
+    """Read-through cache with single-flight loading and per-group invalidation."""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: float,
+        namespace: str = "spaces:list",
+        max_groups: int = 1024,
+    ) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.namespace = namespace
+        self.max_groups = max_groups
+        self._groups_key = f"{namespace}:groups"
+        self._counter_key = f"{namespace}:generations"
+        self._inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+        self._registered = 0  # registrations since the registry was last pruned
+
+    def _generation_key(self, group_id: str) -> str:
+        return f"{self.namespace}:generation:{group_id}"
+
+    async def _new_generation(self, group_id: str) -> bytes:
+        """Move ``group_id`` to a generation number no group has had before."""
+        generation = str(await self.backend.incr(self._counter_key)).encode()
+        await self.backend.set(self._generation_key(group_id), generation, _GENERATION_TTL)
+        return generation
+
+    @staticmethod
+    def _locate(
+        params: SpaceQueryParams, variant: Optional[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], str, str]:
+        """(filter group, group id, page digest) for ``params``."""
+        group, page = _normalize(params)
+        if variant:
+            page = {**page, "variant": variant}
+        return group, _digest(group), _digest(page)
+
+    def _entry_key(self, group_id: str, generation: bytes, page_id: str) -> str:
+        return f"{self.namespace}:entry:{group_id}:g{generation.decode()}:{page_id}"
+
+    async def get(
+        self, params: SpaceQueryParams, variant: Optional[Dict[str, Any]] = None
+    ) -> Optional[bytes]:
+        """Return the cached body for ``params`` if there is one, without loading."""
+        _, group_id, page_id = self._locate(params, variant)
+        generation = await self.backend.get(self._generation_key(group_id))
+        if generation is None:
+            return None
+        return await self.backend.get(self._entry_key(group_id, generation, page_id))
+
+    async def get_or_load(
+        self,
+        params: SpaceQueryParams,
+        loader: Callable[[], Awaitable[bytes]],
+        variant: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """Return the cached body for ``params``, loading it at most once at a time.
+
+        ``variant`` distinguishes different renderings of the same result set
+        (e.g. which facets were requested) without affecting invalidation.
+        """
+        group, group_id, page_id = self._locate(params, variant)
+        generation = await self.backend.get(self._generation_key(group_id))
+        if generation is None:
+            generation = await self._new_generation(group_id)
+        key = self._entry_key(group_id, generation, page_id)
+
+        cached = await self.backend.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The leading request was cancelled; load on our own below
+
+        # Register the group before reading so a write landing mid-load bumps
+        # its generation and the (possibly stale) result is stored under a dead key
+        await self._register(group_id, group)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome retrieved so an unobserved failure does not warn
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            body = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        # Re-stamped as the entry is stored: the group counts as expired only
+        # once every entry stored under it has
+        await self._register(group_id, group)
+        await self.backend.set(key, body, self.ttl)
+        future.set_result(body)
+        return body
+
+    async def _register(self, group_id: str, group: Dict[str, Any]) -> None:
+        await self.backend.hset(
+            self._groups_key,
+            group_id,
+            json.dumps({"group": group, "ts": time.time()}).encode(),
+        )
+        # Reads alone must not grow the registry without bound either
+        self._registered += 1
+        if self._registered >= self.max_groups:
+            await self._live_groups()
+
+    async def _live_groups(self) -> Dict[str, Dict[str, Any]]:
+        """Registered groups that may still have entries, dropping the rest.
+
+        Groups past the TTL have no entries left. Past ``max_groups`` the least
+        recently stored go too, along with any entries they still have.
+        """
+        self._registered = 0
+        now = time.time()
+        registered = [
+            (json.loads(raw), group_id)
+            for group_id, raw in (await self.backend.hgetall(self._groups_key)).items()
+        ]
+        if len(registered) > self.max_groups:
+            registered.sort(key=lambda item: item[0]["ts"], reverse=True)
+        live: Dict[str, Dict[str, Any]] = {}
+        dropped = []
+        for entry, group_id in registered:
+            if entry["ts"] + self.ttl < now or len(live) >= self.max_groups:
+                dropped.append(group_id)
+            else:
+                live[group_id] = entry["group"]
+        if dropped:
+            # Without its generation a group's entries are unreachable, and
+            # dropping it cannot revive old ones: its next generation is a
+            # number it never had
+            await self.backend.hdel(self._groups_key, *dropped)
+            await self.backend.delete(*(self._generation_key(g) for g in dropped))
+        return live
+
+    async def invalidate(self, *rows: Dict[str, Any]) -> None:
+        """Invalidate every group any of ``rows`` matches.
+
+        Pass snapshots of both the old and the new version of an updated row.
+        """
+        for group_id, group in (await self._live_groups()).items():
+            if any(group_matches(group, row) for row in rows):
+                await self._new_generation(group_id)
+
+
+def _create_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        import redis.asyncio as redis  # optional dependency, only needed for this backend
+
+        return RedisCacheBackend(redis.from_url(settings.REDIS_URL))
+    return MemoryCacheBackend(max_entries=settings.CACHE_MAX_ENTRIES)
+
+
+_backend: Optional[CacheBackend] = _create_backend() if settings.CACHE_ENABLED else None
+
+listing_cache: Optional[ListingCache] = (
+    ListingCache(_backend, ttl=settings.CACHE_TTL_SECONDS, max_groups=settings.CACHE_MAX_GROUPS)
+    if _backend is not None
+    else None
+)
+facet_cache: Optional[ListingCache] = (
+    ListingCache(
+        _backend,
+        ttl=settings.FACET_CACHE_TTL_SECONDS,
+        namespace="spaces:facets",
+        max_groups=settings.CACHE_MAX_GROUPS,
+    )
+    if _backend is not None
+    else None
+)
+
+
+async def invalidate_caches(*rows: Dict[str, Any]) -> None:
+    """Invalidate every response cache for a committed write touching ``rows``.
+
+    Listing ETags move first, so no body cached after the invalidation is
+    tagged with the version from before the write.
+    """
+    await http_cache.bump_table_version()
+    for cache in (listing_cache, facet_cache):
+        if cache is not None:
+            await cache.invalidate(*rows)
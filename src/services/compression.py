@@ -0,0 +1,138 @@
+"""Response compression: brotli or gzip, negotiated per request.
+
+A pure ASGI middleware compresses text-like responses of at least
+``minimum_size`` bytes. Brotli is preferred when the client accepts it and the
+optional ``brotli`` package is installed; gzip is always available. Streamed
+bodies (exports) are compressed chunk by chunk and flushed after each chunk,
+so rows still reach the client as they are produced.
+
+Bodies that already carry a ``Content-Encoding`` and non-text types such as
+photos pass through untouched.
+"""
+
+import importlib.util
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Media types worth compressing; everything else (images) is already compact
+_COMPRESSIBLE = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Preferred supported coding for an ``Accept-Encoding`` value, or None."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    # Highest quality wins; brotli on ties, as it compresses JSON better
+    candidates = [("br", accepted.get("br", wildcard))] if BROTLI_AVAILABLE else []
+    candidates.append(("gzip", accepted.get("gzip", wildcard)))
+    coding, quality = max(candidates, key=lambda candidate: candidate[1])
+    return coding if quality > 0 else None
+
+
+class _Compressor:
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int) -> None:
+        if coding == "br":
+            import brotli  # optional dependency, only used when installed
+
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits 16 + 15: gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Compress responses of at least ``minimum_size`` bytes for clients that accept it."""
+
+    def __init__(
+        self, app: Any, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = b""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value
+                break
+        coding = negotiate(accept.decode("latin-1"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Dict[str, Any]] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if compressor is not None:
+                body = compressor.compress(message.get("body", b""), not message.get("more_body"))
+                await send({**message, "body": body})
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            headers: List[Tuple[bytes, bytes]] = list(start.get("headers", ()))
+            if not self._compressible(headers) or (not more and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressor = _Compressor(coding, self.gzip_level, self.brotli_quality)
+            body = compressor.compress(body, not more)
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+            headers.append((b"content-encoding", coding.encode()))
+            if not more:
+                headers.append((b"content-length", str(len(body)).encode()))
+            headers.append((b"vary", b"Accept-Encoding"))
+            await send({**start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _compressible(headers: List[Tuple[bytes, bytes]]) -> bool:
+        content_type = b""
+        for key, value in headers:
+            name = key.lower()
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(_COMPRESSIBLE)
@@ -0,0 +1,109 @@
+"""Cheap total-count estimates for space listings.
+
+Two sources, tried in order:
+
+* Per-(space_type, is_available) counters covering the common unfiltered and
+  type/availability-only listings. They are loaded with one grouped scan,
+  adjusted in place by this process's writes and reloaded every
+  ``COUNT_ESTIMATE_TTL_SECONDS`` to pick up other workers' writes.
+* The Postgres planner's row estimate (``EXPLAIN``) for the same query.
+
+When neither applies (e.g. an arbitrary filter on SQLite) callers fall back
+to an exact ``COUNT``.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from src.config import settings
+from src.models.space import Space
+from src.schemas.space import SpaceQueryParams
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = {"space_type", "is_available"}
+
+
+class CountEstimator:
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._counts: Dict[Tuple[str, Optional[bool]], int] = {}
+        self._loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def _ensure_fresh(self, db: AsyncSession) -> None:
+        if time.monotonic() - self._loaded_at < self.ttl:
+            return
+        async with self._lock:
+            if time.monotonic() - self._loaded_at < self.ttl:
+                return
+            stmt = select(Space.space_type, Space.is_available, func.count()).group_by(
+                Space.space_type, Space.is_available
+            )
+            rows = (await db.execute(stmt)).all()
+            self._counts = {(space_type, available): n for space_type, available, n in rows}
+            self._loaded_at = time.monotonic()
+
+    def adjust(self, row: Dict[str, Any], delta: int) -> None:
+        """Apply a local write (+1 insert, -1 delete) until the next reload."""
+        key = (row["space_type"], row["is_available"])
+        self._counts[key] = max(self._counts.get(key, 0) + delta, 0)
+
+    def expire(self) -> None:
+        """Reload on next use, e.g. after a write whose old row was not read."""
+        self._loaded_at = float("-inf")
+
+    async def from_counters(self, db: AsyncSession, query: SpaceQueryParams) -> Optional[int]:
+        if not set(query.active_filters()) <= COUNTER_FIELDS:
+            return None
+        await self._ensure_fresh(db)
+        return sum(
+            n
+            for (space_type, available), n in self._counts.items()
+            if (query.space_type is None or space_type == query.space_type)
+            and (query.is_available is None or available == query.is_available)
+        )
+
+
+class _Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a statement, keeping its bound parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, stmt: Select) -> None:
+        self.stmt = stmt
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+async def planner_estimate(db: AsyncSession, stmt: Select) -> Optional[int]:
+    """Row estimate for ``stmt`` from the Postgres planner, without running it."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    try:
+        # In a savepoint: a failed statement aborts the whole transaction on
+        # Postgres, and the caller still has to count exactly
+        async with db.begin_nested():
+            plan = (await db.execute(_Explain(stmt))).scalar_one()
+    except SQLAlchemyError:
+        logger.debug("Planner estimate unavailable", exc_info=True)
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+count_estimator = CountEstimator(ttl=settings.COUNT_ESTIMATE_TTL_SECONDS)
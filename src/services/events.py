@@ -0,0 +1,284 @@
+"""Change feed: create/update/delete events for spaces, pushed to stream clients.
+
+The service publishes a ``SpaceEvent`` after every committed write. Each
+``GET /spaces/stream`` connection subscribes with its filters; subscribers
+are grouped by filter set, so an event is matched once per distinct filter
+set (with the same row matching as cache invalidation) and rendered once,
+then appended to each client's pending frames. An idle client costs a
+deque and an ``asyncio.Event``.
+
+With ``EVENTS_BACKEND = "postgres"`` events are also sent with ``NOTIFY``
+and every worker ``LISTEN``s on one dedicated connection, so clients of any
+worker see writes made through any other. Payloads are capped at 8000
+bytes by Postgres; an event whose space does not fit travels without it
+and the receiving worker loads the space by id.
+
+Delivery is best effort: a client that falls ``EVENTS_MAX_PENDING`` frames
+behind, or a worker whose listener reconnects, misses events. The client
+gets a ``reset`` event (or a reconnect) and should revalidate its listing,
+which costs a 304 when nothing changed.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from src.config import settings
+from src.database import engine
+from src.schemas.space import SpaceQueryParams
+from src.services.cache import filter_group, group_matches
+from src.services.loaders import primary_space_loader
+from src.services.serialization import dumps, space_to_dict
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process's own notifications, already delivered locally
+_ORIGIN = uuid.uuid4().hex
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+_MAX_PAYLOAD = 7900
+
+
+class SpaceEvent(NamedTuple):
+    type: str  # "created", "updated" or "deleted"
+    space_id: int
+    row: Dict[str, Any]  # cache snapshot after the write (before it, for deletes)
+    before: Optional[Dict[str, Any]] = None  # cache snapshot before an update
+    space: Optional[Dict[str, Any]] = None  # rendered space; loaded by id when missing
+
+
+def frame(event: str, data: Any) -> bytes:
+    """One server-sent event."""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class Subscription:
+    """Frames waiting to be sent to one stream client."""
+
+    def __init__(self, group: Dict[str, Any], max_pending: int) -> None:
+        self.group = group
+        self.max_pending = max_pending
+        self.overflowed = False
+        self._frames: Deque[bytes] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, data: bytes) -> None:
+        if len(self._frames) >= self.max_pending:
+            # Too slow to keep up; the stream ends and the client starts over
+            self.overflowed = True
+            self._frames.clear()
+        else:
+            self._frames.append(data)
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """Pending frames, b"" if none arrived within ``timeout``, None once overflowed."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return b""
+        self._ready.clear()
+        if self.overflowed:
+            return None
+        data = b"".join(self._frames)
+        self._frames.clear()
+        return data
+
+
+class PostgresRelay:
+    """Carry events between workers over ``LISTEN``/``NOTIFY``."""
+
+    def __init__(self, bus: "EventBus", channel: str, reconnect_seconds: float = 5.0) -> None:
+        self.bus = bus
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def notify(self, events: Iterable[SpaceEvent]) -> None:
+        payloads = list(self._payloads(events))
+        async with engine.connect() as conn:
+            for payload in payloads:
+                await conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": payload},
+                )
+            await conn.commit()
+
+    @staticmethod
+    def _payloads(events: Iterable[SpaceEvent]) -> Iterable[str]:
+        """JSON payloads under the NOTIFY limit, packing several events into each."""
+        batch: List[str] = []
+        size = 0
+        for event in events:
+            encoded = dumps(event._asdict()).decode()
+            if len(encoded) > _MAX_PAYLOAD - 100:
+                encoded = dumps(event._replace(space=None)._asdict()).decode()
+            if batch and size + len(encoded) > _MAX_PAYLOAD - 100:
+                yield '{"origin":"%s","events":[%s]}' % (_ORIGIN, ",".join(batch))
+                batch, size = [], 0
+            batch.append(encoded)
+            size += len(encoded) + 1
+        if batch:
+            yield '{"origin":"%s","events":[%s]}' % (_ORIGIN, ",".join(batch))
+
+    def _receive(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        message = json.loads(payload)
+        if message["origin"] == _ORIGIN:
+            return
+        self.bus.deliver(
+            SpaceEvent(e["type"], e["space_id"], e["row"], e.get("before"), e["space"])
+            for e in message["events"]
+        )
+
+    async def _listen(self) -> None:
+        import asyncpg  # the Postgres driver, only needed for this backend
+
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn.render_as_string(hide_password=False))
+                await connection.add_listener(self.channel, self._receive)
+                while True:
+                    # Idle connections can die silently; a ping notices
+                    await asyncio.sleep(settings.EVENTS_HEARTBEAT_SECONDS)
+                    await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Change feed listener failed; reconnecting")
+            finally:
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(self.reconnect_seconds)
+
+
+class EventBus:
+    """In-process fan-out of space events to stream subscribers."""
+
+    def __init__(self, max_pending: int, max_subscribers: int, backend: str = "memory") -> None:
+        self.max_pending = max_pending
+        self.max_subscribers = max_subscribers
+        self.relay = PostgresRelay(self, settings.EVENTS_CHANNEL) if backend == "postgres" else None
+        self._groups: Dict[str, Tuple[Dict[str, Any], Set[Subscription]]] = {}
+        self._count = 0
+        self._inbox: Deque[SpaceEvent] = deque()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        if self.relay is not None:
+            self.relay.start()
+
+    async def stop(self) -> None:
+        if self.relay is not None:
+            await self.relay.stop()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+    def subscribe(self, params: SpaceQueryParams) -> Optional[Subscription]:
+        """Register a client for events matching ``params``; None when at capacity."""
+        if self._count >= self.max_subscribers:
+            return None
+        group_id, group = filter_group(params)
+        subscription = Subscription(group, self.max_pending)
+        self._groups.setdefault(group_id, (group, set()))[1].add(subscription)
+        self._count += 1
+        if self._dispatcher is None:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for group_id, (_, members) in list(self._groups.items()):
+            if subscription in members:
+                members.discard(subscription)
+                self._count -= 1
+                if not members:
+                    del self._groups[group_id]
+                return
+
+    async def publish(self, *events: SpaceEvent) -> None:
+        """Send committed writes to local subscribers and, if relayed, other workers.
+
+        Never raises: a lost event must not fail the write that caused it.
+        """
+        self.deliver(events)
+        if self.relay is not None and events:
+            try:
+                await self.relay.notify(events)
+            except Exception:
+                logger.exception("Publishing %d space events failed", len(events))
+
+    def deliver(self, events: Iterable[SpaceEvent]) -> None:
+        if self._groups:
+            self._inbox.extend(events)
+            self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch = list(self._inbox)
+            self._inbox.clear()
+            try:
+                await self._fan_out(batch)
+            except Exception:
+                logger.exception("Dispatching %d space events failed", len(batch))
+
+    async def _fan_out(self, batch: List[SpaceEvent]) -> None:
+        routed: List[Tuple[SpaceEvent, Dict[str, List[Subscription]]]] = []
+        for event in batch:
+            targets: Dict[str, List[Subscription]] = {}
+            for group, members in self._groups.values():
+                if group_matches(group, event.row):
+                    targets.setdefault(event.type, []).extend(members)
+                elif event.before is not None and group_matches(group, event.before):
+                    # Moved out of this client's filters
+                    targets.setdefault("removed", []).extend(members)
+            if targets:
+                routed.append((event, targets))
+
+        # One coalesced lookup for the events that arrived without their space
+        missing = [e.space_id for e, t in routed if e.space is None and e.type != "deleted"]
+        # From the primary: a replica may not have the write yet
+        loaded = (
+            dict(zip(missing, await primary_space_loader.load_many(missing))) if missing else {}
+        )
+
+        for event, targets in routed:
+            for kind, members in targets.items():
+                if kind in ("deleted", "removed"):
+                    data = frame(kind, {"id": event.space_id})
+                elif event.space is not None:
+                    data = frame(kind, event.space)
+                elif loaded.get(event.space_id) is not None:
+                    data = frame(kind, space_to_dict(loaded[event.space_id]))
+                else:
+                    continue  # deleted since; its own event follows
+                for subscription in members:
+                    subscription.push(data)
+
+
+space_events = EventBus(
+    max_pending=settings.EVENTS_MAX_PENDING,
+    max_subscribers=settings.EVENTS_MAX_SUBSCRIBERS,
+    backend=settings.EVENTS_BACKEND,
+)
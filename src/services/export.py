@@ -0,0 +1,52 @@
+"""Streaming NDJSON/CSV encoders for catalog exports.
+
+Both encoders consume batches of row mappings as the database hands them over
+and emit one chunk per batch, so memory stays bounded by the batch size.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+
+from src.schemas.space import SpaceResponse
+from src.services.serialization import dumps
+
+EXPORT_FIELDS = list(SpaceResponse.model_fields)
+JSON_LIST_FIELDS = {"amenities", "photos"}
+
+
+def _row(row: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(row)
+    for field in JSON_LIST_FIELDS:
+        out[field] = out.get(field) or []
+    return out
+
+
+async def ndjson_stream(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield b"".join(dumps(_row(row)) + b"\n" for row in batch)
+
+
+def _csv_cell(field: str, value: Any) -> Any:
+    if value is None:
+        return ""
+    if field in JSON_LIST_FIELDS:
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def csv_stream(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue().encode()
+
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(f, row[f]) for f in EXPORT_FIELDS] for row in batch)
+        yield buffer.getvalue().encode()
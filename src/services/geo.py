@@ -0,0 +1,124 @@
+"""Geohash helpers for indexed radius and bounding-box search.
+
+Each space stores a fixed-precision geohash next to its coordinates. A query
+area is covered by a small set of geohash cells; since every point inside a
+cell shares the cell's prefix, each cell becomes a ``geohash`` range predicate
+that a plain B-tree index can answer on both SQLite and Postgres. Exact
+lat/lon predicates then trim the cell overhang.
+"""
+
+import math
+from typing import List, NamedTuple, Tuple
+
+from sqlalchemy import ColumnElement, and_, or_
+
+from src.models.space import Space
+
+GEOHASH_PRECISION = 9  # ~5m cells
+MAX_COVER_CELLS = 16
+
+KM_PER_DEGREE = 111.32
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+class BoundingBox(NamedTuple):
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+
+
+def _bits(precision: int) -> Tuple[int, int]:
+    """(lat_bits, lon_bits) for a geohash of ``precision`` characters."""
+    total = 5 * precision
+    return total // 2, total - total // 2
+
+
+def _cell_index(value: float, low: float, high: float, bits: int) -> int:
+    cells = 1 << bits
+    index = int((value - low) / (high - low) * cells)
+    return min(max(index, 0), cells - 1)
+
+
+def _hash_from_indices(lat_index: int, lon_index: int, precision: int) -> str:
+    lat_bits, lon_bits = _bits(precision)
+    value = 0
+    # Geohash interleaves bits starting with longitude
+    for position in range(5 * precision):
+        if position % 2 == 0:
+            lon_bits -= 1
+            bit = (lon_index >> lon_bits) & 1
+        else:
+            lat_bits -= 1
+            bit = (lat_index >> lat_bits) & 1
+        value = (value << 1) | bit
+
+    chars = []
+    for _ in range(precision):
+        chars.append(_BASE32[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_bits, lon_bits = _bits(precision)
+    return _hash_from_indices(
+        _cell_index(latitude, -90.0, 90.0, lat_bits),
+        _cell_index(longitude, -180.0, 180.0, lon_bits),
+        precision,
+    )
+
+
+def covering_cells(box: BoundingBox) -> List[str]:
+    """Finest set of at most MAX_COVER_CELLS geohash prefixes covering ``box``."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_bits, lon_bits = _bits(precision)
+        lat_lo = _cell_index(box.min_lat, -90.0, 90.0, lat_bits)
+        lat_hi = _cell_index(box.max_lat, -90.0, 90.0, lat_bits)
+        lon_lo = _cell_index(box.min_lon, -180.0, 180.0, lon_bits)
+        lon_hi = _cell_index(box.max_lon, -180.0, 180.0, lon_bits)
+        if (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) <= MAX_COVER_CELLS:
+            return sorted(
+                _hash_from_indices(i, j, precision)
+                for i in range(lat_lo, lat_hi + 1)
+                for j in range(lon_lo, lon_hi + 1)
+            )
+    return []  # box too large to prune; caller falls back to lat/lon predicates
+
+
+def radius_box(latitude: float, longitude: float, radius_km: float) -> BoundingBox:
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    return BoundingBox(
+        max(latitude - lat_delta, -90.0),
+        max(longitude - lon_delta, -180.0),
+        min(latitude + lat_delta, 90.0),
+        min(longitude + lon_delta, 180.0),
+    )
+
+
+def box_filter(box: BoundingBox) -> ColumnElement:
+    """Index-pruned predicate selecting spaces inside ``box``."""
+    exact = and_(
+        Space.latitude.between(box.min_lat, box.max_lat),
+        Space.longitude.between(box.min_lon, box.max_lon),
+    )
+    cells = covering_cells(box)
+    if not cells:
+        return exact
+    # Every base32 character sorts below "~", so [cell, cell + "~") spans the prefix
+    ranges = [and_(Space.geohash >= cell, Space.geohash < cell + "~") for cell in cells]
+    return and_(or_(*ranges), exact)
+
+
+def distance_sq_km(latitude: float, longitude: float) -> ColumnElement:
+    """Squared equirectangular distance in km² from the given point.
+
+    Pure arithmetic, so it runs on SQLite without math extensions; accurate to
+    well under 1% for the radii we accept.
+    """
+    kx = KM_PER_DEGREE * math.cos(math.radians(latitude))
+    dx = (Space.longitude - longitude) * kx
+    dy = (Space.latitude - latitude) * KM_PER_DEGREE
+    return dx * dx + dy * dy
@@ -0,0 +1,182 @@
+"""HTTP validators and Cache-Control policies for GET responses.
+
+Listing ETags are derived from the ``table_versions`` counter, which every
+write to the listing tables bumps once it has committed, and the query
+parameters; the body is never hashed. A conditional request is answered
+with ``304 Not Modified`` after one primary-key lookup, before the listing
+query runs. These ETags are weak: a write elsewhere changes them without
+changing the bytes, and estimated counts can differ between two renders of
+the same version.
+
+A single space is validated by its id and row version, which every write
+increments; ``If-Match`` with that ETag makes a write conditional on it.
+
+``CacheControlMiddleware`` adds the ``CACHE_CONTROL`` policy configured for
+the matched route's name to successful GET responses.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request, Response, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import engine
+from src.models.space import Space
+
+logger = logging.getLogger(__name__)
+
+
+# Counters a write failed to bump; bumped again before this process reads them
+_unbumped: Set[str] = set()
+
+
+async def table_version(db: AsyncSession, name: str = "spaces") -> int:
+    """Current write counter for ``name``; changes whenever its tables do.
+
+    Raises if an earlier bump of ``name`` failed and still cannot be made:
+    the counter would vouch for content that has changed.
+    """
+    if name in _unbumped:
+        await _bump(name)
+        _unbumped.discard(name)
+    result = await db.execute(
+        text("SELECT version FROM table_versions WHERE name = :name"), {"name": name}
+    )
+    return result.scalar_one()
+
+
+async def _bump(name: str) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("UPDATE table_versions SET version = version + 1 WHERE name = :name"),
+            {"name": name},
+        )
+
+
+async def bump_table_version(name: str = "spaces", attempts: int = 3) -> None:
+    """Advance ``name``'s counter after a write has committed; never raises.
+
+    The bump is a transaction of its own, so the counter row is locked for
+    one statement and never together with a writer's row locks. Writes made
+    outside ``SpaceService`` must call this too. If every attempt fails, this
+    process bumps the counter before it next reads it.
+    """
+    for attempt in range(attempts):
+        try:
+            await _bump(name)
+        except Exception:
+            if attempt + 1 < attempts:
+                await asyncio.sleep(0.05 * 2**attempt)
+                continue
+            logger.exception("Bumping the %s table version failed", name)
+            _unbumped.add(name)
+        else:
+            _unbumped.discard(name)
+        return
+
+
+def listing_etag(version: int, route: str, params: Dict[str, Any]) -> str:
+    """Weak ETag for ``route`` rendered with ``params`` at table ``version``."""
+    encoded = json.dumps(
+        {"route": route, "version": version, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    ).encode()
+    return f'W/"{hashlib.sha1(encoded).hexdigest()[:27]}"'
+
+
+def version_etag(space_id: int, version: int) -> str:
+    """Strong ETag for version ``version`` of a space."""
+    return f'"{space_id}-{version}"'
+
+
+def space_etag(space: Space) -> str:
+    return version_etag(space.id, space.version)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """Whether the request's ``If-None-Match`` matches ``etag`` (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in header.split(","))
+
+
+def if_match_versions(request: Request, space_id: int) -> Optional[List[int]]:
+    """Versions of space ``space_id`` that ``If-Match`` accepts.
+
+    None when the header is absent or ``*`` (any version). Weak and foreign
+    ETags never match, so a header listing only those yields an empty list.
+    """
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return None
+    versions = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if not (tag.startswith('"') and tag.endswith('"')):
+            continue
+        tag_id, _, version = tag[1:-1].partition("-")
+        if tag_id == str(space_id) and version.isdigit():
+            versions.append(int(version))
+    return versions
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def pack(etag: str, body: bytes) -> bytes:
+    """Prefix a body with its ETag for the response cache, so hits need no query."""
+    return etag.encode() + b"\n" + body
+
+
+def unpack(value: bytes) -> Tuple[str, bytes]:
+    etag, _, body = value.partition(b"\n")
+    return etag.decode(), body
+
+
+class CacheControlMiddleware:
+    """ASGI middleware adding a per-route ``Cache-Control`` to GET 200/304 responses.
+
+    ``policies`` maps route names (the endpoint function, e.g. ``get_spaces``)
+    to header values. A ``Cache-Control`` set by the endpoint itself wins.
+    """
+
+    def __init__(self, app: Any, policies: Dict[str, str]) -> None:
+        self.app = app
+        self.policies = {name: value.encode() for name, value in policies.items()}
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                policy = self._policy(scope)
+                headers: Iterable[Tuple[bytes, bytes]] = message.get("headers", ())
+                if policy is not None and not any(k.lower() == b"cache-control" for k, _ in headers):
+                    message["headers"] = [*headers, (b"cache-control", policy)]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _policy(self, scope: Dict[str, Any]) -> Optional[bytes]:
+        # Set by the router once a route matched; mounts have none
+        route = scope.get("route")
+        return self.policies.get(getattr(route, "name", None))
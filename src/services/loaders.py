@@ -0,0 +1,129 @@
+"""Coalesced lookups by primary key (the DataLoader pattern).
+
+Keys requested while the event loop runs one iteration are collected and
+fetched together once the scheduled dispatch runs, so N concurrent
+``GET /spaces/{id}`` calls (one per rendered card) cost one ``IN`` query
+instead of N. Batches are shared across requests and use their own session.
+
+Only in-flight lookups are shared; nothing is cached once a batch resolves,
+so a lookup never returns data older than the moment it was made (or, on a
+replica, than the replica's state at that moment; ``primary_space_loader``
+reads the primary).
+"""
+
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Mapping, Optional, Set, TypeVar
+
+from fastapi import Request
+from sqlalchemy import select
+
+from src.config import settings
+from src.database import read_session, reads_from_primary
+from src.models.space import Space
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class BatchLoader(Generic[K, V]):
+    """Coalesce concurrent ``load`` calls into calls of ``batch_fn``.
+
+    ``batch_fn`` receives distinct keys and returns a mapping of the ones it
+    found. With ``window`` > 0 the dispatch waits that many seconds for more
+    keys instead of only until the next loop iteration.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[K]], Awaitable[Mapping[K, V]]],
+        max_batch_size: int = 500,
+        window: float = 0.0,
+    ) -> None:
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._pending: Dict[K, "asyncio.Future[Optional[V]]"] = {}
+        self._scheduled = False
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        """The value for ``key``, or None if ``batch_fn`` did not find it."""
+        # Shielded: one caller giving up must not cancel the lookup for the rest
+        return await asyncio.shield(self._enqueue(key))
+
+    async def load_many(self, keys: List[K]) -> List[Optional[V]]:
+        """Values for ``keys`` in order, None for the missing ones."""
+        return list(await asyncio.shield(asyncio.gather(*(self._enqueue(k) for k in keys))))
+
+    def _enqueue(self, key: K) -> "asyncio.Future[Optional[V]]":
+        future = self._pending.get(key)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Mark the outcome retrieved so a failure nobody waits for does not warn
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending[key] = future
+        if not self._scheduled:
+            self._scheduled = True
+            if self.window > 0:
+                loop.call_later(self.window, self._dispatch)
+            else:
+                loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch_size]}
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[K, "asyncio.Future[Optional[V]]"]) -> None:
+        try:
+            found = await self.batch_fn(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+async def load_spaces(ids: List[int], primary: bool = False) -> Dict[int, Space]:
+    """Fetch spaces by id with one ``IN`` query on a dedicated (replica) session."""
+    async with read_session(primary) as session:
+        result = await session.execute(select(Space).where(Space.id.in_(ids)))
+        return {space.id: space for space in result.scalars()}
+
+
+space_loader: BatchLoader[int, Space] = BatchLoader(
+    load_spaces,
+    max_batch_size=settings.LOADER_MAX_BATCH_SIZE,
+    window=settings.LOADER_WINDOW_MS / 1000,
+)
+# Without replicas both read the primary, so they share batches
+primary_space_loader: BatchLoader[int, Space] = (
+    BatchLoader(
+        partial(load_spaces, primary=True),
+        max_batch_size=settings.LOADER_MAX_BATCH_SIZE,
+        window=settings.LOADER_WINDOW_MS / 1000,
+    )
+    if settings.DATABASE_REPLICA_URLS
+    else space_loader
+)
+
+
+def space_loader_for(request: Request) -> BatchLoader[int, Space]:
+    """The loader reading where ``request`` should read from."""
+    return primary_space_loader if reads_from_primary(request) else space_loader
@@ -0,0 +1,263 @@
+"""Request and database metrics in Prometheus text format.
+
+A pure ASGI middleware records per-route latency histograms, in-flight
+requests and response status codes; SQLAlchemy cursor hooks time every
+statement and count queries per request. Metrics live in process memory and
+are rendered on demand by ``GET /metrics``.
+
+Observations happen on the event loop thread, so the collectors skip locking
+and an observation costs a dict lookup and a bisect. Label values are bounded:
+routes are reported by their path template, never the raw URL.
+"""
+
+import bisect
+import contextvars
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args: Any, buckets: Tuple[float, ...], **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum]
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bounds = [*self.buckets, float("inf")]
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                label_str = _format_labels((*self.labels, "le"), (*labels, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route, method and status code.",
+    ("method", "route", "status"),
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "Time until the response body is complete.",
+    ("method", "route"), buckets=LATENCY_BUCKETS,
+)
+http_in_flight = Gauge("http_requests_in_flight", "Requests currently being served.")
+db_statements = Histogram(
+    "db_statement_duration_seconds", "Database statement execution time by operation and outcome.",
+    ("operation", "outcome"), buckets=DB_LATENCY_BUCKETS,
+)
+db_queries_per_request = Histogram(
+    "http_request_db_queries", "Database statements issued per HTTP request.",
+    ("route",), buckets=QUERY_COUNT_BUCKETS,
+)
+db_time_per_request = Histogram(
+    "http_request_db_seconds", "Total database time per HTTP request.",
+    ("route",), buckets=LATENCY_BUCKETS,
+)
+admission_active = Gauge(
+    "http_admission_active", "Admitted requests running, by route class.", ("class",)
+)
+admission_wait = Histogram(
+    "http_admission_wait_seconds", "Time spent queued for admission, by route class.",
+    ("class",), buckets=LATENCY_BUCKETS,
+)
+admission_rejected = Counter(
+    "http_admission_rejected_total", "Requests turned away, by route class and reason.",
+    ("class", "reason"),
+)
+
+REGISTRY: List[_Metric] = [
+    http_requests,
+    http_latency,
+    http_in_flight,
+    db_statements,
+    db_queries_per_request,
+    db_time_per_request,
+    admission_active,
+    admission_wait,
+    admission_rejected,
+]
+
+
+def render() -> bytes:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode()
+
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: contextvars.ContextVar[Optional[_RequestStats]] = contextvars.ContextVar(
+    "request_db_stats", default=None
+)
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "EXPLAIN"} else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    _record(conn, statement, "ok")
+
+
+def _handle_error(context: Any) -> None:
+    # after_cursor_execute never fires for a statement that raised
+    if context.connection is not None and context.statement is not None:
+        _record(context.connection, context.statement, "error")
+
+
+def _record(conn: Any, statement: str, outcome: str) -> None:
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    db_statements.observe(elapsed, _operation(statement), outcome)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run on ``engine`` (pass ``AsyncEngine.sync_engine``)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def _route_label(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    # Unmatched paths share one label so scanners cannot blow up cardinality
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics and a ``Server-Timing`` header."""
+
+    def __init__(self, app: Any, exclude_paths: Iterable[str] = ()) -> None:
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        status = "500"
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                # Statements issued while streaming the body are not included
+                timing = (
+                    f"db;dur={stats.db_seconds * 1000:.1f};desc=\"{stats.queries} queries\", "
+                    f"app;dur={(time.perf_counter() - start) * 1000:.1f}"
+                )
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", timing.encode())]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            _request_stats.reset(token)
+            route = _route_label(scope)
+            method = scope["method"]
+            http_requests.inc(method, route, status)
+            http_latency.observe(time.perf_counter() - start, method, route)
+            db_queries_per_request.observe(stats.queries, route)
+            db_time_per_request.observe(stats.db_seconds, route)
@@ -0,0 +1,199 @@
+"""Photo uploads: stream, hash, deduplicate, thumbnail and store.
+
+The request body is written to a spool file chunk by chunk while it is hashed
+and measured, so memory stays flat and an oversized upload is cut off as soon
+as it crosses ``MAX_FILE_SIZE``. Files are stored under their SHA-256, so an
+image uploaded twice (to any space) is stored once. Thumbnails are resized in
+a process pool, keeping image decoding off the event loop, and are skipped
+when Pillow is not installed.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+from src.config import settings
+from src.services.storage import StorageBackend, storage
+
+logger = logging.getLogger(__name__)
+
+# Storage keys live under this prefix; the local backend serves only it
+PHOTO_PREFIX = "photos"
+
+THUMBNAILS_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+# Leading bytes of each accepted format -> (content type, extension)
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (b"GIF87a", "image/gif", "gif"),
+    (b"GIF89a", "image/gif", "gif"),
+]
+_HEAD_BYTES = 12
+
+
+class UploadRejected(Exception):
+    """An upload the client has to fix; ``status_code`` is the HTTP answer."""
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class StoredPhoto(NamedTuple):
+    url: str
+    sha256: str
+    size: int
+    content_type: str
+    thumbnails: Dict[int, str]  # longest side in px -> URL
+    deduplicated: bool  # the same bytes were already stored
+
+
+def sniff_image(head: bytes) -> Optional[Tuple[str, str]]:
+    """(content type, extension) from an image's leading bytes; None if unsupported.
+
+    The client's Content-Type is not trusted for what gets stored and served.
+    """
+    for signature, content_type, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type, extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    return None
+
+
+def make_thumbnails(source: str, targets: List[Tuple[int, str]]) -> None:
+    """Write a JPEG fitting in a ``size`` x ``size`` box to each target path.
+
+    Runs in a worker process. Raises ValueError if the image cannot be decoded.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(source) as image:
+            # Apply the camera's EXIF rotation, which is lost on re-encoding
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            for size, path in targets:
+                thumbnail = image.copy()
+                thumbnail.thumbnail((size, size))
+                thumbnail.save(path, "JPEG", quality=85, optimize=True)
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise ValueError("Could not decode image") from exc
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _executor() -> Optional[Executor]:
+    """The thumbnail process pool; None (the loop's thread pool) when disabled."""
+    global _pool
+    if settings.THUMBNAIL_WORKERS <= 0:
+        return None
+    if _pool is None:
+        # spawn rather than fork: the API process runs event-loop and DB threads
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown() -> None:
+    """Stop the thumbnail workers; called on application shutdown."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _write(spool: BinaryIO, digest: Any, chunk: bytes) -> None:
+    # hashlib releases the GIL on large buffers, so both run off the loop
+    digest.update(chunk)
+    spool.write(chunk)
+
+
+def _photo_key(sha256: str, extension: str) -> str:
+    return f"{PHOTO_PREFIX}/{sha256}.{extension}"
+
+
+def _thumbnail_key(sha256: str, size: int) -> str:
+    return f"{PHOTO_PREFIX}/{sha256}_{size}.jpg"
+
+
+async def store_photo(
+    chunks: AsyncIterator[bytes], backend: StorageBackend = storage
+) -> StoredPhoto:
+    """Spool, validate and store an uploaded image plus its thumbnails.
+
+    Raises UploadRejected for empty, oversized, undecodable or non-image
+    bodies; nothing is stored in that case.
+    """
+    await asyncio.to_thread(backend.spool_dir.mkdir, parents=True, exist_ok=True)
+    path = backend.spool_dir / uuid.uuid4().hex
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    spooled: List[Path] = [path]
+    try:
+        with open(path, "wb") as spool:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.MAX_FILE_SIZE:
+                    raise UploadRejected(
+                        413, f"Photos are limited to {settings.MAX_FILE_SIZE} bytes"
+                    )
+                if len(head) < _HEAD_BYTES:
+                    head += chunk[: _HEAD_BYTES - len(head)]
+                await asyncio.to_thread(_write, spool, digest, chunk)
+        if size == 0:
+            raise UploadRejected(400, "Empty upload")
+        kind = sniff_image(head)
+        if kind is None:
+            raise UploadRejected(415, "Only JPEG, PNG, GIF and WebP images are accepted")
+        content_type, extension = kind
+        sha256 = digest.hexdigest()
+
+        url = await backend.find(_photo_key(sha256, extension))
+        thumbnails: Dict[int, Optional[str]] = {}
+        for thumb_size in settings.PHOTO_THUMBNAIL_SIZES:
+            thumbnails[thumb_size] = await backend.find(_thumbnail_key(sha256, thumb_size))
+
+        # Generated before the original is stored, so undecodable files are rejected
+        missing = [s for s, thumb_url in thumbnails.items() if thumb_url is None]
+        if missing and THUMBNAILS_AVAILABLE:
+            targets = [(s, str(path.with_name(f"{path.name}_{s}.jpg"))) for s in missing]
+            spooled += [Path(target) for _, target in targets]
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(_executor(), make_thumbnails, str(path), targets)
+            except ValueError as exc:
+                raise UploadRejected(422, str(exc)) from exc
+            for thumb_size, target in targets:
+                thumbnails[thumb_size] = await backend.save(
+                    _thumbnail_key(sha256, thumb_size), Path(target), "image/jpeg"
+                )
+        elif missing:
+            logger.debug("Pillow is not installed; no thumbnails for %s", sha256)
+
+        deduplicated = url is not None
+        if url is None:
+            url = await backend.save(_photo_key(sha256, extension), path, content_type)
+        return StoredPhoto(
+            url=url,
+            sha256=sha256,
+            size=size,
+            content_type=content_type,
+            thumbnails={s: u for s, u in thumbnails.items() if u is not None},
+            deduplicated=deduplicated,
+        )
+    finally:
+        for leftover in spooled:
+            await asyncio.to_thread(leftover.unlink, missing_ok=True)
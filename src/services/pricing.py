@@ -0,0 +1,67 @@
+"""Normalized prices for comparing listings quoted in different units.
+
+A listing is priced per hour, day, week or month (``SpaceBase`` allows only
+one). Filtering and sorting need a common unit, so every write also stores
+the equivalent hourly and daily price in ``effective_price_per_hour`` and
+``effective_price_per_day``. Both are indexed; see migration 0004.
+
+The conversion factors are baked into stored rows: changing them needs a
+data migration that recomputes both columns.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy import func
+
+from src.models.space import Space
+
+# Price column -> hours it covers, in order of precedence
+UNIT_HOURS = {
+    "price_per_hour": 1,
+    "price_per_day": 24,
+    "price_per_week": 24 * 7,
+    "price_per_month": 24 * 30,
+}
+PRICE_FIELDS = tuple(UNIT_HOURS)
+EFFECTIVE_FIELDS = ("effective_price_per_hour", "effective_price_per_day")
+
+# Matches the Numeric(12, 4) columns
+_QUANTUM = Decimal("0.0001")
+
+
+def _quantize(value: Decimal) -> Decimal:
+    return value.quantize(_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def effective_prices(prices: Mapping[str, Any]) -> Dict[str, Optional[Decimal]]:
+    """Hourly and daily equivalents of the first price set, hour to month."""
+    for field, hours in UNIT_HOURS.items():
+        value = prices.get(field)
+        if value is not None:
+            per_hour = Decimal(value) / hours
+            return {
+                "effective_price_per_hour": _quantize(per_hour),
+                "effective_price_per_day": _quantize(per_hour * 24),
+            }
+    return dict.fromkeys(EFFECTIVE_FIELDS)
+
+
+def effective_price_expressions(cleared: Mapping[str, Any]) -> Dict[str, Any]:
+    """SQL computing the effective prices of a stored row once ``cleared`` are unset.
+
+    For updates that drop a price without quoting a new one, so the row's other
+    prices need not be read first. Values are None if no price would remain.
+    """
+    terms = [
+        getattr(Space, field) / hours
+        for field, hours in UNIT_HOURS.items()
+        if field not in cleared
+    ]
+    if not terms:
+        return dict.fromkeys(EFFECTIVE_FIELDS)
+    per_hour = func.coalesce(*terms)
+    return {
+        "effective_price_per_hour": func.round(per_hour, 4),
+        "effective_price_per_day": func.round(per_hour * 24, 4),
+    }
@@ -0,0 +1,96 @@
+"""Full-text search index for Spaces.
+
+Postgres gets a generated, weighted ``tsvector`` column with a GIN index;
+SQLite gets an external-content FTS5 table kept in sync by triggers. Both are
+created by migration 0002 and maintained by the database itself, so every
+create/update is indexed without any application-side bookkeeping. When
+neither is available the service falls back to the original ILIKE scan.
+"""
+
+import logging
+import re
+from typing import NamedTuple, Optional
+
+from sqlalchemy import ColumnElement, Integer, column, func, literal_column, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.config import settings
+from src.database import has_schema_object
+from src.models.space import Space
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "spaces_fts"
+
+# Set by detect_search_index(); None means "use the ILIKE fallback"
+_backend: Optional[str] = None
+
+# Index object whose presence means the migration for each backend has run
+_INDEX_OBJECTS = {"postgresql": "ix_spaces_search_vector", "sqlite": FTS_TABLE}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchClause(NamedTuple):
+    condition: ColumnElement
+    rank: ColumnElement  # ORDER BY expression, best match first
+
+
+def search_backend() -> Optional[str]:
+    return _backend
+
+
+async def detect_search_index(conn: AsyncConnection) -> None:
+    """Enable the dialect's search index if the migrations created it."""
+    global _backend
+    _backend = None
+    if not settings.SEARCH_FULL_TEXT:
+        return
+
+    name = _INDEX_OBJECTS.get(conn.dialect.name)
+    if name is None or not await has_schema_object(conn, name):
+        logger.info("No full-text index for dialect %s; using ILIKE search", conn.dialect.name)
+        return
+    _backend = conn.dialect.name
+
+
+def _fts5_query(term: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query: every word, prefix-matched, AND-ed."""
+    tokens = _TOKEN_RE.findall(term)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_clause(term: str) -> Optional[SearchClause]:
+    """Build the indexed match condition and rank for ``term``.
+
+    Returns None when the caller should fall back to ILIKE.
+    """
+    if _backend == "postgresql":
+        vector = literal_column("spaces.search_vector")
+        tsquery = func.websearch_to_tsquery(literal_column("'english'::regconfig"), term)
+        return SearchClause(
+            condition=vector.op("@@")(tsquery),
+            rank=func.ts_rank(vector, tsquery).desc(),
+        )
+
+    if _backend == "sqlite":
+        match = _fts5_query(term)
+        if match is None:
+            return None
+        matching_ids = text(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_query"
+        ).bindparams(fts_query=match).columns(column("rowid", Integer))
+        # bm25() is only defined inside a MATCH query, hence the correlated subquery.
+        # Column weights favour title, then location, then description.
+        rank = text(
+            f"(SELECT bm25({FTS_TABLE}, 10.0, 1.0, 5.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE}.rowid = spaces.id AND {FTS_TABLE} MATCH :fts_rank_query)"
+        ).bindparams(fts_rank_query=match)
+        return SearchClause(
+            condition=Space.id.in_(matching_ids),
+            rank=rank,  # bm25: lower is better
+        )
+
+    return None
@@ -0,0 +1,80 @@
+"""Fast ORM-to-JSON path for Space responses.
+
+Rows were validated by the request schemas on the way in, so responses are
+built as plain dicts straight from ORM attributes and encoded with orjson,
+skipping Pydantic construction, constraint checks and re-serialization.
+The ``SpaceResponse`` models remain the documented contract via
+``response_model``; endpoints return ``FastJSONResponse`` directly, which
+FastAPI passes through untouched.
+"""
+
+from decimal import Decimal
+from typing import Any, Dict, Optional, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from src.models.space import Space
+
+# Matches Pydantic's JSON output: UTC as "Z", naive datetimes left naive
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        # Pydantic serializes Decimal as a string; keep the wire format stable
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Stored as NULL when empty, returned as []
+_LIST_FIELDS = {"amenities", "photos"}
+
+
+def space_to_dict(space: Space, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """``SpaceResponse``-shaped dict for a trusted ORM row, limited to ``fields`` if given."""
+    if fields is not None:
+        return {
+            field: (getattr(space, field) or []) if field in _LIST_FIELDS else getattr(space, field)
+            for field in fields
+        }
+    return {
+        "id": space.id,
+        "external_id": space.external_id,
+        "title": space.title,
+        "description": space.description,
+        "space_type": space.space_type,
+        "location": space.location,
+        "address": space.address,
+        "city": space.city,
+        "state": space.state,
+        "zip_code": space.zip_code,
+        "country": space.country,
+        "latitude": space.latitude,
+        "longitude": space.longitude,
+        "price_per_hour": space.price_per_hour,
+        "price_per_day": space.price_per_day,
+        "price_per_week": space.price_per_week,
+        "price_per_month": space.price_per_month,
+        "effective_price_per_hour": space.effective_price_per_hour,
+        "effective_price_per_day": space.effective_price_per_day,
+        "area_sqft": space.area_sqft,
+        "max_capacity": space.max_capacity,
+        "amenities": space.amenities or [],
+        "is_available": space.is_available,
+        "available_from": space.available_from,
+        "available_until": space.available_until,
+        "photos": space.photos or [],
+        "created_at": space.created_at,
+        "updated_at": space.updated_at,
+        "version": space.version,
+    }
@@ -1,25 +1,393 @@
 """Service layer for Space domain operations."""
 
+import base64
+import binascii
 import json
 import logging
-from typing import List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from sqlalchemy import and_, func, or_, select
+from pydantic import ValidationError
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    case,
+    delete,
+    func,
+    literal_column,
+    null,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
-from src.models.space import Space
-from src.schemas.space import SpaceCreate, SpaceQueryParams, SpaceUpdate
+from src.config import settings
+from src.models.space import AREA_SORT_KEY, CAPACITY_SORT_KEY, Space, SpaceAvailability
+from src.schemas.space import (
+    AvailabilityWindow,
+    SpaceBulkItemResult,
+    SpaceBulkResponse,
+    SpaceCreate,
+    SpaceQueryParams,
+    SpaceUpdate,
+    as_utc,
+)
+from src.services import geo, pricing
+from src.services.amenities import amenity_clause
+from src.services.availability import availability_clause, merge_windows
+from src.services.cache import SNAPSHOT_FIELDS, invalidate_caches, snapshot
+from src.services.counts import COUNTER_FIELDS, count_estimator, planner_estimate
+from src.services.events import SpaceEvent, space_events
+from src.services.serialization import space_to_dict
+from src.services.suggest import SUGGEST_FIELDS, suggest_index
+from src.services.search import search_clause
 
 logger = logging.getLogger(__name__)
 
 
-def _parse_json_field(json_str: Optional[str]) -> List[str]:
-    if not json_str:
-        return []
+class _SortKey(NamedTuple):
+    expr: Any
+    descending: bool
+    value: Callable[[Space], Any]  # JSON-safe sort value of a row, for cursors
+    parse: Callable[[Any], Any]  # inverse of ``value``
+    column: str  # the attribute ``value`` reads
+
+
+# Keyset orderings, each backed by an index on (key, id). Ties break on id in
+# the same direction, so (key, id) is a total order a cursor can seek into.
+SORT_KEYS: Dict[str, _SortKey] = {
+    "newest": _SortKey(
+        Space.created_at,
+        True,
+        lambda s: s.created_at.isoformat(),
+        datetime.fromisoformat,
+        "created_at",
+    ),
+    "price_asc": _SortKey(
+        Space.effective_price_per_hour,
+        False,
+        lambda s: str(s.effective_price_per_hour),
+        Decimal,
+        "effective_price_per_hour",
+    ),
+    "price_desc": _SortKey(
+        Space.effective_price_per_hour,
+        True,
+        lambda s: str(s.effective_price_per_hour),
+        Decimal,
+        "effective_price_per_hour",
+    ),
+    "area": _SortKey(AREA_SORT_KEY, True, lambda s: s.area_sqft or 0, int, "area_sqft"),
+    "capacity": _SortKey(CAPACITY_SORT_KEY, True, lambda s: s.max_capacity or 0, int, "max_capacity"),
+}
+
+
+def _keyset_sort(query: SpaceQueryParams) -> str:
+    """The keyset ordering for ``query``; distance sorts page by number only."""
+    return query.sort if query.sort in SORT_KEYS else "newest"
+
+
+def _encode_cursor(space: Space, sort: str = "newest") -> str:
+    """Encode the (sort key, id) keyset position of ``space`` as an opaque token."""
+    position = [SORT_KEYS[sort].value(space), space.id]
+    if sort != "newest":
+        # Tagged so a cursor cannot be replayed against a different ordering
+        position.append(sort)
+    payload = json.dumps(position, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(token: str, sort: str = "newest") -> Tuple[Any, int]:
+    """Inverse of ``_encode_cursor``; raises ValueError on malformed tokens."""
     try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
+        padded = token + "=" * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, space_id, cursor_sort = position if len(position) == 3 else (*position, "newest")
+        if cursor_sort != sort:
+            raise ValueError(f"cursor is for sort={cursor_sort}")
+        return SORT_KEYS[sort].parse(value), int(space_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError, InvalidOperation) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+
+
+def _geohash(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    if latitude is None or longitude is None:
+        return None
+    return geo.encode(latitude, longitude)
+
+
+def _row_values(data: SpaceCreate) -> Dict[str, Any]:
+    """Column values for a new row, including derived columns."""
+    return {
+        "external_id": data.external_id,
+        "title": data.title,
+        "description": data.description,
+        "space_type": data.space_type,
+        "location": data.location,
+        "address": data.address,
+        "city": data.city,
+        "state": data.state,
+        "zip_code": data.zip_code,
+        "country": data.country,
+        "latitude": data.latitude,
+        "longitude": data.longitude,
+        "geohash": _geohash(data.latitude, data.longitude),
+        "price_per_hour": data.price_per_hour,
+        "price_per_day": data.price_per_day,
+        "price_per_week": data.price_per_week,
+        "price_per_month": data.price_per_month,
+        **pricing.effective_prices(dict(data)),
+        "area_sqft": data.area_sqft,
+        "max_capacity": data.max_capacity,
+        "amenities": data.amenities or None,
+        "is_available": data.is_available,
+        "available_from": data.available_from,
+        "available_until": data.available_until,
+        "photos": data.photos or None,
+    }
+
+
+# Columns writes read back as they were before, for cache invalidation, the
+# change feed and the suggestion index
+_OLD_FIELDS = tuple(dict.fromkeys((*SNAPSHOT_FIELDS, *SUGGEST_FIELDS)))
+
+_NO_PRICE = "price: a space needs an hourly, daily, weekly or monthly price"
+
+
+def _update_values(
+    data: SpaceUpdate, current: Optional[Mapping[str, Any]] = None
+) -> Dict[str, Any]:
+    """Column values for a partial update, including derived columns.
+
+    ``current`` holds the row's stored prices. Without it, an update that only
+    clears prices gets SQL expressions for the effective prices, resolved
+    against the stored row. Raises ValueError if the update would leave the
+    space without any price.
+    """
+    updates = data.model_dump(exclude_unset=True)
+    if "latitude" in updates:
+        updates["geohash"] = _geohash(updates["latitude"], updates["longitude"])
+    if any(field in updates for field in pricing.PRICE_FIELDS):
+        if any(updates.get(field) is not None for field in pricing.PRICE_FIELDS):
+            # Quoting a price in a new unit replaces the old one
+            for field in pricing.PRICE_FIELDS:
+                updates.setdefault(field, None)
+            updates.update(pricing.effective_prices(updates))
+        elif current is not None:
+            prices = {**{field: current[field] for field in pricing.PRICE_FIELDS}, **updates}
+            updates.update(pricing.effective_prices(prices))
+        else:
+            updates.update(pricing.effective_price_expressions(updates))
+        if updates["effective_price_per_hour"] is None:
+            raise ValueError(_NO_PRICE)
+    return updates
+
+
+def _legacy_windows(
+    available_from: Optional[datetime], available_until: Optional[datetime]
+) -> List[Tuple[datetime, datetime]]:
+    """The single window described by the legacy from/until columns, if complete."""
+    if available_from is None or available_until is None:
         return []
+    starts_at, ends_at = as_utc(available_from), as_utc(available_until)
+    return [(starts_at, ends_at)] if starts_at < ends_at else []
+
+
+def _validation_messages(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+        for error in exc.errors(include_url=False)
+    ]
+
+
+def _dialect_insert(dialect: str):
+    """INSERT construct supporting ON CONFLICT for the bound dialect."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:  # pragma: no cover - only Postgres and SQLite are deployed
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+    return insert
+
+
+class _Filters(NamedTuple):
+    conditions: List[Any]
+    distance: Optional[Any]  # squared-distance expression when `near` is set
+    rank: Optional[Any]  # relevance ORDER BY when full-text search is active
+
+
+def _ilike_contains(column: Any, value: str) -> Any:
+    """Case-insensitive substring match; ``%`` and ``_`` in ``value`` match themselves.
+
+    Cache invalidation and the change feed test rows with a plain substring
+    check, so wildcards here would let a listing hold rows they never match.
+    """
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
+
+
+def _build_filters(query: SpaceQueryParams) -> _Filters:
+    """Translate query params into WHERE conditions plus ordering helpers."""
+    filters = []
+    if query.space_type:
+        filters.append(Space.space_type == query.space_type)
+    if query.city:
+        filters.append(_ilike_contains(Space.city, query.city))
+    if query.state:
+        filters.append(_ilike_contains(Space.state, query.state))
+    # Normalized prices, so listings quoted in any unit are compared
+    price = (
+        Space.effective_price_per_day
+        if query.price_unit == "day"
+        else Space.effective_price_per_hour
+    )
+    if query.min_price is not None:
+        filters.append(price >= query.min_price)
+    if query.max_price is not None:
+        filters.append(price <= query.max_price)
+    if query.is_available is not None:
+        filters.append(Space.is_available == query.is_available)
+    if query.amenities:
+        filters.append(amenity_clause(query.amenities, query.amenities_match))
+    if query.bbox is not None:
+        filters.append(geo.box_filter(geo.BoundingBox(*query.bbox)))
+    if query.available_between is not None:
+        filters.append(availability_clause(*query.available_between))
+    distance = None
+    if query.near is not None:
+        lat, lon = query.near
+        distance = geo.distance_sq_km(lat, lon)
+        filters.append(geo.box_filter(geo.radius_box(lat, lon, query.radius_km)))
+        filters.append(distance <= query.radius_km * query.radius_km)
+
+    rank = None
+    if query.search:
+        clause = search_clause(query.search)
+        if clause is not None:
+            filters.append(clause.condition)
+            rank = clause.rank
+        else:
+            filters.append(
+                or_(
+                    _ilike_contains(Space.title, query.search),
+                    _ilike_contains(Space.description, query.search),
+                    _ilike_contains(Space.location, query.search),
+                )
+            )
+    return _Filters(filters, distance, rank)
+
+
+def _page_statement(
+    query: SpaceQueryParams, base_stmt: Select, distance: Optional[Any], rank: Optional[Any]
+) -> Tuple[Select, bool]:
+    """Ordered, paged listing query; also reports whether it is ranked.
+
+    Keyset mode seeks straight to the cursor position through the sort's
+    (key, id) index, so its cost does not grow with depth. Page-number mode is
+    kept for older clients. Distance and relevance ordering only apply in page
+    mode, and relevance only to the default sort; cursors are always
+    keyset-ordered.
+    """
+    sort = _keyset_sort(query)
+    key = SORT_KEYS[sort]
+    ranked = not query.after and (
+        query.sort == "distance" or (rank is not None and query.sort == "newest")
+    )
+    stmt = base_stmt
+    if ranked and query.sort == "distance":
+        stmt = stmt.order_by(distance)
+    elif ranked:
+        stmt = stmt.order_by(rank)
+    if key.descending:
+        stmt = stmt.order_by(key.expr.desc(), Space.id.desc())
+    else:
+        stmt = stmt.order_by(key.expr.asc(), Space.id.asc())
+    if query.after:
+        after_value, after_id = _decode_cursor(query.after, sort)
+        # Spelled out rather than as a row-value comparison, which SQLite
+        # cannot turn into an index seek on the expression keys
+        if key.descending:
+            position = and_(
+                key.expr <= after_value, or_(key.expr < after_value, Space.id < after_id)
+            )
+        else:
+            position = and_(
+                key.expr >= after_value, or_(key.expr > after_value, Space.id > after_id)
+            )
+        stmt = stmt.where(position)
+    else:
+        stmt = stmt.offset((query.page - 1) * query.per_page)
+    # One extra row tells us whether a next page exists without a second query
+    return stmt.limit(query.per_page + 1), ranked
+
+
+def _price_buckets(edges: Sequence[float]) -> Tuple[Any, List[str]]:
+    """CASE expression bucketing the effective hourly price, plus labels in order.
+
+    Edges and labels are inlined rather than bound: Postgres only matches the
+    CASE in the select list to the one in GROUPING SETS if they are textually
+    identical, and separately bound parameters would differ.
+    """
+    labels = []
+    price = Space.effective_price_per_hour
+    whens = [(price.is_(None), null())]
+    lower = 0.0
+    for edge in sorted(edges):
+        label = f"{lower:g}-{edge:g}"
+        whens.append((price < literal_column(f"{edge:g}"), literal_column(f"'{label}'")))
+        labels.append(label)
+        lower = edge
+    labels.append(f"{lower:g}+")
+    return case(*whens, else_=literal_column(f"'{labels[-1]}'")), labels
+
+
+FACET_COLUMNS = {
+    "space_type": Space.space_type,
+    "city": Space.city,
+    "state": Space.state,
+    "is_available": Space.is_available,
+}
+
+
+class SpacePage(NamedTuple):
+    spaces: List[Space]
+    total: Optional[int]
+    next_cursor: Optional[str]
+    count_mode: str
+
+
+class VersionConflict(Exception):
+    """A conditional write found the space at a different version."""
+
+    def __init__(self, current: int) -> None:
+        super().__init__(f"Space is at version {current}")
+        self.current = current
+
+
+class DuplicateExternalId(Exception):
+    """A write would give a space an ``external_id`` another space has."""
+
+    def __init__(self, external_id: str) -> None:
+        super().__init__(f"external_id: {external_id!r} already exists")
+        self.external_id = external_id
 
 
 class SpaceService:
@@ -29,100 +397,521 @@ class SpaceService:
         self.db = db
 
     async def create_space(self, data: SpaceCreate) -> Space:
-        amenities_json = json.dumps(data.amenities) if data.amenities else None
-        photos_json = json.dumps(data.photos) if data.photos else None
-
-        space = Space(
-            title=data.title,
-            description=data.description,
-            space_type=data.space_type,
-            location=data.location,
-            address=data.address,
-            city=data.city,
-            state=data.state,
-            zip_code=data.zip_code,
-            country=data.country,
-            price_per_hour=data.price_per_hour,
-            price_per_day=data.price_per_day,
-            price_per_week=data.price_per_week,
-            price_per_month=data.price_per_month,
-            area_sqft=data.area_sqft,
-            max_capacity=data.max_capacity,
-            amenities=amenities_json,
-            is_available=data.is_available,
-            available_from=data.available_from,
-            available_until=data.available_until,
-            photos=photos_json,
-        )
+        """Insert a space; raises DuplicateExternalId if its ``external_id`` is taken."""
+        space = Space(**_row_values(data))
 
         self.db.add(space)
-        await self.db.commit()
+        try:
+            await self.db.flush()
+            await self._replace_windows(
+                {space.id: _legacy_windows(data.available_from, data.available_until)}
+            )
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            if data.external_id is None:
+                raise
+            raise DuplicateExternalId(data.external_id)
         await self.db.refresh(space)
+        after = snapshot(space)
+        count_estimator.adjust(after, +1)
+        suggest_index.update(None, {f: getattr(space, f) for f in SUGGEST_FIELDS})
+        await invalidate_caches(after)
+        await space_events.publish(
+            SpaceEvent("created", space.id, after, space=space_to_dict(space))
+        )
         return space
 
     async def get_space_by_id(self, space_id: int) -> Optional[Space]:
         result = await self.db.execute(select(Space).where(Space.id == space_id))
         return result.scalar_one_or_none()
 
-    async def get_spaces(self, query: SpaceQueryParams) -> Tuple[List[Space], int]:
-        filters = []
-        if query.space_type:
-            filters.append(Space.space_type == query.space_type)
-        if query.city:
-            filters.append(Space.city.ilike(f"%{query.city}%"))
-        if query.state:
-            filters.append(Space.state.ilike(f"%{query.state}%"))
-        if query.min_price is not None:
-            filters.append(Space.price_per_hour >= query.min_price)
-        if query.max_price is not None:
-            filters.append(Space.price_per_hour <= query.max_price)
-        if query.is_available is not None:
-            filters.append(Space.is_available == query.is_available)
-        if query.search:
-            filters.append(
-                or_(
-                    Space.title.ilike(f"%{query.search}%"),
-                    Space.description.ilike(f"%{query.search}%"),
-                    Space.location.ilike(f"%{query.search}%"),
-                )
-            )
+    async def get_spaces(self, query: SpaceQueryParams) -> SpacePage:
+        """One page of spaces matching ``query``.
+
+        With ``query.fields`` only those columns (plus the id and the sort
+        key, for the cursor) are selected; other attributes of the returned
+        rows are unloaded and must not be accessed.
+        """
+        filters, distance, rank = _build_filters(query)
 
         base_stmt = select(Space)
+        if query.fields is not None:
+            columns = {*query.fields, SORT_KEYS[_keyset_sort(query)].column}
+            base_stmt = base_stmt.options(load_only(*(getattr(Space, c) for c in columns)))
         count_stmt = select(func.count(Space.id))
         if filters:
             base_stmt = base_stmt.where(and_(*filters))
             count_stmt = count_stmt.where(and_(*filters))
 
-        total = (await self.db.execute(count_stmt)).scalar_one()
+        # Estimates come from maintained counters or planner statistics; when
+        # neither covers the query we pay for the exact count after all
+        total: Optional[int] = None
+        count_mode = query.count
+        if query.count == "estimated":
+            total = await count_estimator.from_counters(self.db, query)
+            if total is None:
+                total = await planner_estimate(self.db, base_stmt)
+            if total is None:
+                count_mode = "exact"
+        if query.count != "none" and total is None:
+            total = int((await self.db.execute(count_stmt)).scalar_one())
 
-        offset = (query.page - 1) * query.per_page
-        stmt = base_stmt.order_by(Space.created_at.desc()).offset(offset).limit(query.per_page)
+        stmt, ranked = _page_statement(query, base_stmt, distance, rank)
         result = await self.db.execute(stmt)
-        spaces = result.scalars().all()
-        return list(spaces), int(total)
+        spaces = list(result.scalars().all())
+        next_cursor = None
+        if len(spaces) > query.per_page:
+            spaces = spaces[: query.per_page]
+            if not ranked:
+                next_cursor = _encode_cursor(spaces[-1], _keyset_sort(query))
+        return SpacePage(spaces, total, next_cursor, count_mode)
 
-    async def update_space(self, space_id: int, data: SpaceUpdate) -> Optional[Space]:
-        space = await self.get_space_by_id(space_id)
-        if not space:
-            return None
+    async def get_facets(
+        self, query: SpaceQueryParams, facets: Sequence[str]
+    ) -> Tuple[int, Dict[str, List[Tuple[Any, int]]]]:
+        """Count matching spaces per value of each facet in one grouped scan.
+
+        Returns the total match count and, per facet, (value, count) pairs,
+        most frequent first (price buckets in ascending order).
+        """
+        price_expr, price_labels = _price_buckets(settings.FACET_PRICE_BUCKETS)
+        exprs = {name: price_expr if name == "price" else FACET_COLUMNS[name] for name in facets}
+        filters = _build_filters(query).conditions
+        grouped_sets = self.db.get_bind().dialect.name == "postgresql"
+
+        columns = [expr.label(name) for name, expr in exprs.items()]
+        if grouped_sets:
+            # One GROUPING SETS pass; grouping() = 0 marks the set a row belongs to
+            columns += [func.grouping(expr).label(f"grouping_{name}") for name, expr in exprs.items()]
+            group_by = [func.grouping_sets(*(tuple_(expr) for expr in exprs.values()))]
+        else:
+            # No GROUPING SETS (SQLite): group by the combination, roll up below
+            group_by = list(exprs.values())
+        stmt = select(*columns, func.count().label("count")).group_by(*group_by)
+        if filters:
+            stmt = stmt.where(and_(*filters))
+
+        counts: Dict[str, Dict[Any, int]] = {name: {} for name in facets}
+        for row in (await self.db.execute(stmt)).mappings():
+            for name in facets:
+                if grouped_sets and row[f"grouping_{name}"]:
+                    continue
+                counts[name][row[name]] = counts[name].get(row[name], 0) + row["count"]
 
-        updates = data.model_dump(exclude_unset=True)
-        for field, value in updates.items():
-            if field in {"amenities", "photos"} and value is not None:
-                setattr(space, field, json.dumps(value))
+        total = sum(counts[facets[0]].values()) if facets else 0
+        result: Dict[str, List[Tuple[Any, int]]] = {}
+        for name, values in counts.items():
+            pairs = [(value, count) for value, count in values.items() if value is not None]
+            if name == "price":
+                pairs.sort(key=lambda pair: price_labels.index(pair[0]))
             else:
-                setattr(space, field, value)
+                pairs.sort(key=lambda pair: (-pair[1], str(pair[0])))
+            result[name] = pairs[: settings.FACET_LIMIT]
+        return total, result
 
+    async def stream_spaces(
+        self, query: SpaceQueryParams, columns: Sequence[str], batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield batches of plain row mappings through a server-side cursor.
+
+        Selects bare columns rather than ORM entities so nothing accumulates in
+        the session's identity map, and skips paging and ordering by anything
+        but the primary key.
+        """
+        filters = _build_filters(query).conditions
+        stmt = select(*(Space.__table__.c[name] for name in columns)).order_by(Space.id)
+        if filters:
+            stmt = stmt.where(and_(*filters))
+        result = await self.db.stream(stmt.execution_options(yield_per=batch_size))
+        async for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
+
+    async def update_space(
+        self, space_id: int, data: SpaceUpdate, versions: Optional[Sequence[int]] = None
+    ) -> Optional[Space]:
+        """Apply a partial update with one ``UPDATE ... RETURNING``; None if not found.
+
+        With ``versions`` (from If-Match) the update only applies while the
+        stored version is one of them, else VersionConflict is raised. No row
+        lock is held beyond the statement. Raises ValueError if the update
+        would leave the space without a price, DuplicateExternalId if it sets
+        an ``external_id`` another space has.
+        """
+        values = _update_values(data)
+        old = None
+        before = None
+        old_row = select(Space.id, *(getattr(Space, field) for field in _OLD_FIELDS))
+        if self.db.get_bind().dialect.name == "postgresql":
+            # The statement also returns the row as it was, locked so no other
+            # write lands in between
+            old = old_row.where(Space.id == space_id).with_for_update().subquery("old")
+            stmt = update(Space).where(Space.id == old.c.id)
+        else:
+            # SQLite cannot return another table's columns: read the row just
+            # before, which a concurrent write could slip past (development only)
+            result = await self.db.execute(old_row.where(Space.id == space_id))
+            before = result.mappings().first()
+            stmt = update(Space).where(Space.id == space_id)
+        if versions is not None:
+            stmt = stmt.where(Space.version.in_(versions))
+        price = values.get("effective_price_per_hour")
+        if isinstance(price, ColumnElement):
+            # Prices were only cleared: refuse if the stored row has none left
+            stmt = stmt.where(price.is_not(None))
+        old_columns = []
+        if old is not None:
+            old_columns = [old.c[field].label(f"old_{field}") for field in _OLD_FIELDS]
+        stmt = (
+            stmt.values(**values, version=Space.version + 1)
+            .returning(Space, *old_columns)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            row = (await self.db.execute(stmt)).first()
+        except IntegrityError:
+            await self.db.rollback()
+            if values.get("external_id") is None:
+                raise
+            raise DuplicateExternalId(values["external_id"])
+        if row is None:
+            current = await self._stored_version(space_id)
+            if current is None:
+                return None
+            if versions is not None and current not in versions:
+                raise VersionConflict(current)
+            raise ValueError(_NO_PRICE)
+        space = row[0]
+        if old_columns:
+            before = {field: row._mapping[f"old_{field}"] for field in _OLD_FIELDS}
+        else:
+            before = {field: before[field] for field in _OLD_FIELDS}
+
+        if "available_from" in values or "available_until" in values:
+            await self._replace_windows(
+                {space.id: _legacy_windows(space.available_from, space.available_until)}
+            )
         await self.db.commit()
-        await self.db.refresh(space)
+
+        after = snapshot(space)
+        if COUNTER_FIELDS & values.keys():
+            count_estimator.expire()
+        suggest_index.update(before, values)
+        before = {field: before[field] for field in SNAPSHOT_FIELDS}
+        await invalidate_caches(before, after)
+        await space_events.publish(
+            SpaceEvent("updated", space.id, after, before, space_to_dict(space))
+        )
         return space
 
-    async def delete_space(self, space_id: int) -> bool:
-        space = await self.get_space_by_id(space_id)
-        if not space:
-            return False
-        await self.db.delete(space)
+    async def delete_space(self, space_id: int, versions: Optional[Sequence[int]] = None) -> bool:
+        """Delete with one ``DELETE ... RETURNING``; False if not found.
+
+        ``versions`` works as for ``update_space``.
+        """
+        if self.db.get_bind().dialect.name == "sqlite":
+            # SQLite does not enforce ON DELETE CASCADE by default
+            await self.db.execute(
+                delete(SpaceAvailability).where(SpaceAvailability.space_id == space_id)
+            )
+        stmt = delete(Space).where(Space.id == space_id)
+        if versions is not None:
+            stmt = stmt.where(Space.version.in_(versions))
+        stmt = stmt.returning(*(getattr(Space, field) for field in _OLD_FIELDS))
+        row = (
+            await self.db.execute(stmt.execution_options(synchronize_session=False))
+        ).mappings().first()
+        if row is None:
+            current = await self._stored_version(space_id)
+            if current is None:
+                return False
+            raise VersionConflict(current)
+
         await self.db.commit()
+        before = dict(row)
+        count_estimator.adjust(before, -1)
+        suggest_index.update(before, None)
+        await invalidate_caches(before)
+        await space_events.publish(SpaceEvent("deleted", space_id, before))
         return True
 
+    async def _stored_version(self, space_id: int) -> Optional[int]:
+        """Version of a space after a conditional write missed it; ends the transaction."""
+        result = await self.db.execute(select(Space.version).where(Space.id == space_id))
+        current = result.scalar_one_or_none()
+        await self.db.rollback()
+        return current
+
+    async def get_availability(self, space_id: int) -> Optional[List[SpaceAvailability]]:
+        """Availability windows of a space in time order; None if it does not exist."""
+        if await self.get_space_by_id(space_id) is None:
+            return None
+        result = await self.db.execute(
+            select(SpaceAvailability)
+            .where(SpaceAvailability.space_id == space_id)
+            .order_by(SpaceAvailability.starts_at)
+        )
+        return list(result.scalars().all())
+
+    async def set_availability(
+        self,
+        space_id: int,
+        windows: Sequence[AvailabilityWindow],
+        versions: Optional[Sequence[int]] = None,
+    ) -> Optional[List[SpaceAvailability]]:
+        """Replace a space's windows, merging overlaps; None if it does not exist.
+
+        The legacy ``available_from``/``available_until`` columns are set to the
+        span of all windows. ``versions`` works as for ``update_space``.
+        """
+        # Row lock, so the version checked is the one this write replaces
+        result = await self.db.execute(
+            select(Space).where(Space.id == space_id).with_for_update()
+        )
+        space = result.scalar_one_or_none()
+        if not space:
+            return None
+        if versions is not None and space.version not in versions:
+            current = space.version
+            await self.db.rollback()
+            raise VersionConflict(current)
+        before = snapshot(space)
+        merged = merge_windows((w.starts_at, w.ends_at) for w in windows)
+        await self._replace_windows({space_id: merged})
+        # The legacy columns are naive timestamps
+        space.available_from = merged[0][0].replace(tzinfo=None) if merged else None
+        space.available_until = merged[-1][1].replace(tzinfo=None) if merged else None
+        space.version = Space.version + 1
+        await self.db.commit()
+        await invalidate_caches(before, snapshot(space))
+        # The version is still an unrendered SQL expression; subscribers load the row
+        await space_events.publish(SpaceEvent("updated", space_id, snapshot(space), before))
+        return await self.get_availability(space_id)
+
+    async def add_photo(self, space_id: int, url: str) -> Optional[Space]:
+        """Append a stored photo's URL unless already there; None if the space is gone."""
+        # Row lock, so concurrent uploads to one space do not drop each other's URL
+        result = await self.db.execute(
+            select(Space).where(Space.id == space_id).with_for_update()
+        )
+        space = result.scalar_one_or_none()
+        if not space:
+            return None
+        photos = list(space.photos or [])
+        if url not in photos:
+            before = snapshot(space)
+            space.photos = photos + [url]
+            space.version = Space.version + 1
+            await self.db.commit()
+            await self.db.refresh(space)
+            await invalidate_caches(snapshot(space))
+            await space_events.publish(
+                SpaceEvent("updated", space.id, snapshot(space), before, space_to_dict(space))
+            )
+        return space
+
+    async def _replace_windows(self, windows: Dict[int, List[Tuple[datetime, datetime]]]) -> None:
+        """Swap in new windows per space inside the caller's transaction."""
+        if not windows:
+            return
+        await self.db.execute(
+            delete(SpaceAvailability).where(SpaceAvailability.space_id.in_(list(windows)))
+        )
+        rows = [
+            {"space_id": space_id, "starts_at": starts_at, "ends_at": ends_at}
+            for space_id, space_windows in windows.items()
+            for starts_at, ends_at in merge_windows(space_windows)
+        ]
+        if rows:
+            await self.db.execute(SpaceAvailability.__table__.insert(), rows)
+
+    async def bulk_write(
+        self, items: List[Dict[str, Any]], upsert: bool = True, chunk_size: int = 500
+    ) -> SpaceBulkResponse:
+        """Validate and write a batch, committing every ``chunk_size`` items.
+
+        A chunk that fails in the database is rolled back and reported per item;
+        earlier and later chunks are unaffected.
+        """
+        results: List[Optional[SpaceBulkItemResult]] = [None] * len(items)
+        for start in range(0, len(items), chunk_size):
+            chunk = list(enumerate(items[start : start + chunk_size], start))
+            await self._write_chunk(chunk, upsert, results)
+
+        statuses = [result.status for result in results]
+        return SpaceBulkResponse(
+            created=statuses.count("created"),
+            updated=statuses.count("updated"),
+            failed=statuses.count("error"),
+            results=results,
+        )
+
+    async def _write_chunk(
+        self,
+        chunk: List[Tuple[int, Dict[str, Any]]],
+        upsert: bool,
+        results: List[Optional[SpaceBulkItemResult]],
+    ) -> None:
+        def fail(index: int, external_id: Optional[str], *errors: str) -> None:
+            results[index] = SpaceBulkItemResult(
+                index=index, status="error", external_id=external_id, errors=list(errors)
+            )
+
+        creates: Dict[Any, Tuple[int, SpaceCreate]] = {}
+        updates: List[Tuple[int, int, SpaceUpdate]] = []
+        for index, item in chunk:
+            external_id = item.get("external_id")
+            try:
+                if item.get("id") is not None:
+                    payload = {k: v for k, v in item.items() if k != "id"}
+                    updates.append((index, int(item["id"]), SpaceUpdate.model_validate(payload)))
+                    continue
+                data = SpaceCreate.model_validate(item)
+            except ValidationError as exc:
+                fail(index, external_id, *_validation_messages(exc))
+                continue
+            except (TypeError, ValueError):
+                fail(index, external_id, "id: must be an integer")
+                continue
+
+            # Within one chunk the last item for an external_id wins
+            key = data.external_id if data.external_id is not None else ("new", index)
+            if key in creates:
+                superseded = creates[key][0]
+                fail(superseded, data.external_id, f"external_id: superseded by item {index}")
+            creates[key] = (index, data)
+
+        # One read for every row this chunk may overwrite, for upsert
+        # classification and cache invalidation
+        columns = [Space.id, Space.external_id, Space.available_from, Space.available_until]
+        fields = dict.fromkeys((*pricing.PRICE_FIELDS, *_OLD_FIELDS))
+        columns += [getattr(Space, f) for f in fields]
+        external_ids = [data.external_id for _, data in creates.values() if data.external_id]
+        update_ids = [space_id for _, space_id, _ in updates]
+        by_external_id: Dict[str, Dict[str, Any]] = {}
+        by_id: Dict[int, Dict[str, Any]] = {}
+        if external_ids or update_ids:
+            result = await self.db.execute(
+                select(*columns).where(
+                    or_(Space.external_id.in_(external_ids), Space.id.in_(update_ids))
+                )
+            )
+            for row in result.mappings():
+                by_id[row["id"]] = dict(row)
+                if row["external_id"] is not None:
+                    by_external_id[row["external_id"]] = dict(row)
+
+        insert_items: List[Tuple[int, SpaceCreate, Dict[str, Any]]] = []
+        for index, data in creates.values():
+            if data.external_id in by_external_id and not upsert:
+                fail(index, data.external_id, "external_id: already exists")
+            else:
+                insert_items.append((index, data, _row_values(data)))
+
+        update_items: List[Tuple[int, int, SpaceUpdate, Dict[str, Any]]] = []
+        for index, space_id, data in updates:
+            if space_id not in by_id:
+                fail(index, data.external_id, "id: space not found")
+                continue
+            try:
+                values = _update_values(data, by_id[space_id])
+            except ValueError as exc:
+                fail(index, data.external_id, str(exc))
+                continue
+            update_items.append((index, space_id, data, values))
+
+        try:
+            new_ids: List[int] = []
+            if insert_items:
+                insert = _dialect_insert(self.db.get_bind().dialect.name)
+                stmt = insert(Space.__table__)
+                if upsert:
+                    assignments = {
+                        column: stmt.excluded[column]
+                        for column in insert_items[0][2]
+                        if column != "external_id"
+                    }
+                    assignments["updated_at"] = func.now()
+                    assignments["version"] = Space.__table__.c.version + 1
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[Space.external_id], set_=assignments
+                    )
+                # Executed as multi-row INSERT ... VALUES ... RETURNING batches
+                stmt = stmt.returning(Space.id, sort_by_parameter_order=True)
+                result = await self.db.execute(stmt, [values for _, _, values in insert_items])
+                new_ids = list(result.scalars().all())
+
+            rows_to_update = [
+                {"id": space_id, **values} for _, space_id, _, values in update_items if values
+            ]
+            if rows_to_update:
+                # ORM bulk UPDATE by primary key: one executemany per distinct column set
+                await self.db.execute(update(Space), rows_to_update)
+                # Bulk UPDATE by primary key takes plain values only
+                await self.db.execute(
+                    update(Space)
+                    .where(Space.id.in_([row["id"] for row in rows_to_update]))
+                    .values(version=Space.version + 1)
+                    .execution_options(synchronize_session=False)
+                )
+
+            # Keep availability windows in step with the legacy from/until columns
+            windows = {
+                space_id: _legacy_windows(data.available_from, data.available_until)
+                for (_, data, _), space_id in zip(insert_items, new_ids)
+            }
+            for _, space_id, _, values in update_items:
+                if "available_from" in values or "available_until" in values:
+                    current = {**by_id[space_id], **values}
+                    windows[space_id] = _legacy_windows(
+                        current["available_from"], current["available_until"]
+                    )
+            await self._replace_windows(windows)
+
+            await self.db.commit()
+        except SQLAlchemyError as exc:
+            await self.db.rollback()
+            logger.exception("Bulk write chunk failed")
+            for index, data, _ in insert_items:
+                fail(index, data.external_id, f"database: {exc.__class__.__name__}")
+            for index, _, data, _ in update_items:
+                fail(index, data.external_id, f"database: {exc.__class__.__name__}")
+            return
+
+        touched: List[Dict[str, Any]] = []
+        events: List[SpaceEvent] = []
+        for (index, data, values), space_id in zip(insert_items, new_ids):
+            before = by_external_id.get(data.external_id) if data.external_id else None
+            results[index] = SpaceBulkItemResult(
+                index=index,
+                status="updated" if before else "created",
+                id=space_id,
+                external_id=data.external_id,
+            )
+            old = {f: before[f] for f in SNAPSHOT_FIELDS} if before else None
+            after = {f: values[f] for f in SNAPSHOT_FIELDS}
+            if old:
+                touched.append(old)
+                count_estimator.adjust(old, -1)
+            touched.append(after)
+            count_estimator.adjust(after, +1)
+            suggest_index.update(before, values)
+            events.append(SpaceEvent("updated" if old else "created", space_id, after, old))
+        for index, space_id, data, values in update_items:
+            before = {f: by_id[space_id][f] for f in SNAPSHOT_FIELDS}
+            results[index] = SpaceBulkItemResult(
+                index=index,
+                status="updated",
+                id=space_id,
+                external_id=values.get("external_id", by_id[space_id]["external_id"]),
+            )
+            after = {**before, **{f: values[f] for f in SNAPSHOT_FIELDS if f in values}}
+            touched += [before, after]
+            count_estimator.adjust(before, -1)
+            count_estimator.adjust(after, +1)
+            suggest_index.update(by_id[space_id], values)
+            events.append(SpaceEvent("updated", space_id, after, before))
 
+        if touched:
+            await invalidate_caches(*touched)
+            await space_events.publish(*events)
@@ -0,0 +1,115 @@
+"""Object storage for uploaded files.
+
+Backends take a finished local file and store it under a key; uploads are
+spooled to disk first (see src/services/photos.py) because the key is the
+content hash, known only once the whole body has been read.
+
+* ``LocalStorage`` moves files under ``UPLOAD_DIR`` and the app serves them
+  at ``UPLOAD_URL_PREFIX``. Fine for development and single-host deploys.
+* ``VercelBlobStorage`` streams files to Vercel Blob over its HTTP API using
+  ``BLOB_READ_WRITE_TOKEN``.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Optional, Protocol
+
+from src.config import settings
+
+
+class StorageBackend(Protocol):
+    # Directory uploads are spooled to before ``save``
+    spool_dir: Path
+
+    async def find(self, key: str) -> Optional[str]:
+        """Public URL of ``key`` if it is stored, else None."""
+        ...
+
+    async def save(self, key: str, path: Path, content_type: str) -> str:
+        """Store the file at ``path`` (which may be moved) under ``key``; returns its URL."""
+        ...
+
+
+async def _read_chunks(path: Path, chunk_size: int) -> AsyncIterator[bytes]:
+    with open(path, "rb") as source:
+        while chunk := await asyncio.to_thread(source.read, chunk_size):
+            yield chunk
+
+
+class LocalStorage:
+    def __init__(self, root: str, url_prefix: str) -> None:
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+        # Inside the root so that ``save`` is a rename, not a copy
+        self.spool_dir = self.root / ".incoming"
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    async def find(self, key: str) -> Optional[str]:
+        found = await asyncio.to_thread(self._path(key).is_file)
+        return self._url(key) if found else None
+
+    async def save(self, key: str, path: Path, content_type: str) -> str:
+        destination = self._path(key)
+        await asyncio.to_thread(destination.parent.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.move, path, destination)
+        return self._url(key)
+
+
+class VercelBlobStorage:
+    """Public blobs stored at their key, without Vercel's random suffix."""
+
+    API_URL = "https://blob.vercel-storage.com"
+    API_VERSION = "7"
+
+    def __init__(self, token: str, chunk_size: int) -> None:
+        import httpx  # optional dependency, only needed for this backend
+
+        if not token:
+            raise RuntimeError("BLOB_READ_WRITE_TOKEN is required for STORAGE_BACKEND=vercel_blob")
+        self._client = httpx.AsyncClient(
+            base_url=self.API_URL,
+            headers={"authorization": f"Bearer {token}", "x-api-version": self.API_VERSION},
+            timeout=httpx.Timeout(30.0, write=None),
+        )
+        self._chunk_size = chunk_size
+        self.spool_dir = Path(tempfile.gettempdir()) / "space-rental-uploads"
+
+    async def find(self, key: str) -> Optional[str]:
+        response = await self._client.get("/", params={"url": key})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()["url"]
+
+    async def save(self, key: str, path: Path, content_type: str) -> str:
+        response = await self._client.put(
+            f"/{key}",
+            content=_read_chunks(path, self._chunk_size),
+            headers={
+                "x-content-type": content_type,
+                "x-add-random-suffix": "0",
+                # Keys are content hashes, so an overwrite stores identical bytes
+                "x-allow-overwrite": "1",
+                "x-cache-control-max-age": str(365 * 24 * 3600),
+                "content-length": str(os.path.getsize(path)),
+            },
+        )
+        response.raise_for_status()
+        return response.json()["url"]
+
+
+def _create_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "vercel_blob":
+        return VercelBlobStorage(settings.BLOB_READ_WRITE_TOKEN, settings.STORAGE_CHUNK_SIZE)
+    return LocalStorage(settings.UPLOAD_DIR, settings.UPLOAD_URL_PREFIX)
+
+
+storage: StorageBackend = _create_backend()
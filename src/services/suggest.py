@@ -0,0 +1,359 @@
+"""Typeahead suggestions for the search box: cities, states, locations, titles.
+
+``SuggestIndex`` keeps every distinct value of those fields with the number
+of spaces having it, in a sorted array with one key per word the value
+contains, so a keystroke is a binary search plus a short scan. A prefix
+matching more than ``scan_limit`` keys (one or two letters, on a large
+table) instead ranks a candidate list computed for it when the index is
+built, so popular values past the first keys are still found.
+
+The index is built at startup from grouped counts, with the sorting done
+off the event loop, and kept current by this process's writes, which report
+each space's values before and after. Other workers' writes, and values
+whose old state a write could not report, are picked up by a periodic
+background rebuild.
+
+Without the in-memory index (``SUGGEST_IN_MEMORY`` off, or before it has
+loaded) suggestions come from a grouped ``ILIKE`` query, which the trigram
+indexes of migration 0007 serve on Postgres.
+"""
+
+import asyncio
+import bisect
+import heapq
+import logging
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import func, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.models.space import Space
+
+logger = logging.getLogger(__name__)
+
+# In ranking order: a city beats a title with the same prefix
+SUGGEST_FIELDS = ("city", "state", "location", "title")
+_FIELD_RANK = {field: rank for rank, field in enumerate(SUGGEST_FIELDS)}
+
+# Longer keys add memory without changing any realistic match
+_MAX_KEY_LENGTH = 64
+_MAX_CHAR = chr(0x10FFFF)
+# Keys sorted per slice when building; each sort blocks other threads
+_SORT_RUN = 10000
+
+Ref = Tuple[str, str]  # (field, value)
+Entry = Tuple[str, str, bool]  # (field, value, key starts at the value's start)
+Change = Tuple[Optional[Mapping[str, Any]], Optional[Mapping[str, Any]]]  # (before, after)
+
+
+class Suggestion(NamedTuple):
+    field: str
+    value: str
+    count: int  # spaces with this value
+
+
+def normalize(text: str) -> str:
+    """Case- and accent-insensitive form used for matching."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).strip()
+
+
+def _keys(value: str) -> Set[Tuple[str, bool]]:
+    """The normalized value from each word start on, so "gar" finds "Nice garage".
+
+    Each key is paired with whether it is the start of the whole value.
+    """
+    text = normalize(value)
+    return {
+        (text[i:i + _MAX_KEY_LENGTH], i == 0)
+        for i, char in enumerate(text)
+        if char.isalnum() and (i == 0 or not text[i - 1].isalnum())
+    }
+
+
+def _rank(entry: Entry, count: int) -> Tuple[bool, int, int, int, str]:
+    """Sort key: whole-value prefix matches first, then field, popularity and brevity."""
+    field, value, whole = entry
+    return (not whole, _FIELD_RANK[field], -count, len(value), value)
+
+
+def _ranked(candidates: Iterable[Tuple[str, str, int, bool]], limit: int) -> List[Suggestion]:
+    """Best ``limit`` distinct (field, value, count, whole-value match) candidates."""
+    keys = sorted(
+        {
+            (*_rank((field, value, whole), count), field)
+            for field, value, count, whole in candidates
+        }
+    )
+    suggestions: Dict[Ref, Suggestion] = {}
+    for _, _, count, _, value, field in keys:
+        # A value matching at several words appears once per word; the first ranks best
+        if (field, value) not in suggestions:
+            suggestions[field, value] = Suggestion(field, value, -count)
+            if len(suggestions) == limit:
+                break
+    return list(suggestions.values())
+
+
+def _build(
+    counts: Dict[Ref, int], scan_limit: int, top_size: int
+) -> Tuple[List[str], List[Entry], Dict[str, Set[Entry]]]:
+    """Sorted keys, their entries and the candidates of every prefix with too many keys.
+
+    CPU-bound; runs in a worker thread.
+    """
+    pairs = [(key, (*ref, whole)) for ref in counts for key, whole in _keys(ref[1])]
+    # Sorted in slices and merged: one big sort would hold the GIL, and with it
+    # the event loop, for its whole run
+    runs = [sorted(pairs[i:i + _SORT_RUN]) for i in range(0, len(pairs), _SORT_RUN)]
+    pairs = list(heapq.merge(*runs))
+    keys = [key for key, _ in pairs]
+    entries = [entry for _, entry in pairs]
+
+    top: Dict[str, Set[Entry]] = {}
+    # Only prefixes extending one with too many keys can have too many themselves
+    ranges = [(0, len(keys))]
+    length = 1
+    while ranges and length <= _MAX_KEY_LENGTH:
+        wide = []
+        for lo, hi in ranges:
+            i = lo
+            while i < hi:
+                if len(keys[i]) < length:
+                    i += 1
+                    continue
+                prefix = keys[i][:length]
+                j = bisect.bisect_left(keys, prefix + _MAX_CHAR, i, hi)
+                if j - i > scan_limit:
+                    best = heapq.nsmallest(
+                        top_size, entries[i:j], key=lambda e: _rank(e, counts[e[:2]])
+                    )
+                    top[prefix] = set(best)
+                    wide.append((i, j))
+                i = j
+        ranges = wide
+        length += 1
+    return keys, entries, top
+
+
+async def _value_counts(session: AsyncSession) -> Dict[Ref, int]:
+    """Spaces per distinct value of each suggestion field."""
+    selects = [
+        select(literal(field).label("field"), column.label("value"), func.count().label("n"))
+        .where(column.is_not(None), column != "")
+        .group_by(column)
+        for field, column in ((f, getattr(Space, f)) for f in SUGGEST_FIELDS)
+    ]
+    rows = await session.execute(union_all(*(s.subquery().select() for s in selects)))
+    return {(field, value): n for field, value, n in rows}
+
+
+class SuggestIndex:
+    """Sorted-array prefix index over the suggestion fields of every space.
+
+    Prefixes matching more than ``scan_limit`` keys rank their ``top_size``
+    best candidates as of the last build, plus values added since. A value
+    whose count only dropped since can be outranked by one outside the list
+    until the next rebuild.
+    """
+
+    def __init__(self, scan_limit: int, reload_seconds: float, top_size: int) -> None:
+        self.scan_limit = scan_limit
+        self.reload_seconds = reload_seconds
+        self.top_size = top_size
+        self.loaded = False
+        self._keys: List[str] = []
+        self._entries: List[Entry] = []  # parallel to _keys
+        self._counts: Dict[Ref, int] = {}
+        self._top: Dict[str, Set[Entry]] = {}
+        self._loaded_at = float("-inf")
+        self._loading: Optional["asyncio.Task[None]"] = None
+        # Writes that land while a build runs, replayed onto its result
+        self._replay: List[Change] = []
+
+    async def load(self) -> None:
+        """(Re)build the index from the database, without blocking lookups."""
+        self._replay = []
+        self._loading = asyncio.current_task()
+        try:
+            async with AsyncSessionLocal() as session:
+                counts = await _value_counts(session)
+            keys, entries, top = await asyncio.to_thread(
+                _build, counts, self.scan_limit, self.top_size
+            )
+        finally:
+            self._loading = None
+
+        self._keys, self._entries, self._top, self._counts = keys, entries, top, counts
+        self._loaded_at = time.monotonic()
+        self.loaded = True
+        # A write committed just before the counts were read is applied twice;
+        # the next rebuild corrects it
+        for before, after in self._replay:
+            self._apply(before, after)
+        self._replay = []
+
+    def update(
+        self, before: Optional[Mapping[str, Any]], after: Optional[Mapping[str, Any]]
+    ) -> None:
+        """Move one space from its ``before`` values to its ``after`` values.
+
+        ``before`` is None for a new space, or when a write could not read the
+        old values, which then stay counted until the next rebuild. ``after`` is
+        None for a deleted space; fields missing from it did not change.
+        """
+        self._apply(before, after)
+
+    def _apply(
+        self, before: Optional[Mapping[str, Any]], after: Optional[Mapping[str, Any]]
+    ) -> None:
+        if self._loading is not None:
+            self._replay.append((before, after))
+        if not self.loaded:
+            return
+        for field in SUGGEST_FIELDS:
+            if after is not None and field not in after:
+                continue
+            old = before.get(field) if before is not None else None
+            new = after.get(field) if after is not None else None
+            if old == new:
+                continue
+            if old:
+                self._discard((field, old))
+            if new:
+                self._add((field, new))
+
+    def _add(self, ref: Ref) -> None:
+        count = self._counts.get(ref, 0)
+        self._counts[ref] = count + 1
+        for key, whole in _keys(ref[1]):
+            entry = (*ref, whole)
+            if not count:
+                index = bisect.bisect_left(self._keys, key)
+                self._keys.insert(index, key)
+                self._entries.insert(index, entry)
+            # A more popular value may now belong in its prefixes' candidates
+            for prefix in self._wide_prefixes(key):
+                candidates = self._top[prefix]
+                candidates.add(entry)
+                if len(candidates) > 2 * self.top_size:
+                    self._top[prefix] = set(
+                        heapq.nsmallest(self.top_size, candidates, key=self._entry_rank)
+                    )
+
+    def _discard(self, ref: Ref) -> None:
+        count = self._counts.get(ref, 0)
+        if count > 1:
+            self._counts[ref] = count - 1
+            return
+        self._counts.pop(ref, None)
+        for key, whole in _keys(ref[1]):
+            # Other values (e.g. a city and a title) can share the key
+            entry = (*ref, whole)
+            for prefix in self._wide_prefixes(key):
+                self._top[prefix].discard(entry)
+            index = bisect.bisect_left(self._keys, key)
+            while index < len(self._keys) and self._keys[index] == key:
+                if self._entries[index] == entry:
+                    del self._keys[index]
+                    del self._entries[index]
+                    break
+                index += 1
+
+    def _wide_prefixes(self, key: str) -> Iterable[str]:
+        top = self._top
+        return [key[:length] for length in range(1, len(key) + 1) if key[:length] in top]
+
+    def _entry_rank(self, entry: Entry) -> Tuple[bool, int, int, int, str]:
+        return _rank(entry, self._counts.get(entry[:2], 0))
+
+    def search(self, prefix: str, limit: int) -> List[Suggestion]:
+        """Best ``limit`` values with a word starting with ``prefix``."""
+        self._maybe_reload()
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        keys = self._keys
+        start = bisect.bisect_left(keys, prefix)
+        # Every key with the prefix sorts below prefix + the largest code point
+        stop = bisect.bisect_left(
+            keys, prefix + _MAX_CHAR, start, min(start + self.scan_limit + 1, len(keys))
+        )
+        candidates: Iterable[Entry] = self._entries[start:stop]
+        if stop - start > self.scan_limit:
+            candidates = self._top.get(prefix) or self._widen(prefix, start)
+        counts = self._counts
+        return _ranked(
+            (
+                (field, value, counts.get((field, value), 0), whole)
+                for field, value, whole in candidates
+            ),
+            limit,
+        )
+
+    def _widen(self, prefix: str, start: int) -> Set[Entry]:
+        """Candidates of a prefix that grew past ``scan_limit`` keys since the last build."""
+        stop = bisect.bisect_left(self._keys, prefix + _MAX_CHAR, start)
+        candidates = set(
+            heapq.nsmallest(self.top_size, self._entries[start:stop], key=self._entry_rank)
+        )
+        self._top[prefix] = candidates
+        return candidates
+
+    def _maybe_reload(self) -> None:
+        if (
+            self.reload_seconds > 0
+            and self._loading is None
+            and time.monotonic() - self._loaded_at > self.reload_seconds
+        ):
+            # Mark as started now so concurrent lookups do not schedule more
+            self._loaded_at = time.monotonic()
+            asyncio.get_running_loop().create_task(self._reload())
+
+    async def _reload(self) -> None:
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Reloading the suggestion index failed")
+
+
+def _like_prefix(term: str) -> Tuple[str, str]:
+    """ILIKE patterns for a value starting with ``term`` or having a word that does."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%", f"% {escaped}%"
+
+
+async def search_database(db: AsyncSession, prefix: str, limit: int) -> List[Suggestion]:
+    """Suggestions straight from the database, one grouped query per field in one round-trip."""
+    term = prefix.strip()
+    if not term:
+        return []
+    starts, word_starts = _like_prefix(term)
+    selects = []
+    for field in SUGGEST_FIELDS:
+        column = getattr(Space, field)
+        selects.append(
+            select(literal(field).label("field"), column.label("value"), func.count().label("n"))
+            .where(or_(column.ilike(starts, escape="\\"), column.ilike(word_starts, escape="\\")))
+            .group_by(column)
+            .order_by(func.count().desc())
+            .limit(limit)
+        )
+    rows = (await db.execute(union_all(*(s.subquery().select() for s in selects)))).all()
+    prefix = normalize(term)
+    return _ranked(
+        ((field, value, n, normalize(value).startswith(prefix)) for field, value, n in rows if value),
+        limit,
+    )
+
+
+suggest_index = SuggestIndex(
+    scan_limit=settings.SUGGEST_SCAN_LIMIT,
+    reload_seconds=settings.SUGGEST_RELOAD_SECONDS,
+    # Room for values appearing under several words of one prefix
+    top_size=2 * settings.SUGGEST_MAX_LIMIT,
+)